@@ -1,17 +1,23 @@
 import os
 import csv
+import logging
 from datetime import datetime
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
-from models import Base, User, FruitType, Fruit, Recipe
+from app.config import settings
+from app.migrate import upgrade
+from app.models import User, FruitType, Fruit, Recipe
 from passlib.hash import bcrypt
 
-# Create database engine
-DATABASE_URL = "sqlite:///./fruit_platform.db"
-engine = create_engine(DATABASE_URL)
+logger = logging.getLogger(__name__)
 
-# Create all tables
-Base.metadata.create_all(engine)
+# Run from the repository root: python -m app.add_to_db
+engine = create_engine(settings.DATABASE_URL)
+
+# Create missing tables and bring existing ones up to the models
+upgrade(engine)
+
+SAMPLE_DATA = os.path.join(os.path.dirname(os.path.abspath(__file__)), "sample_data")
 
 # Create session
 SessionLocal = sessionmaker(bind=engine)
@@ -37,7 +43,7 @@ def load_fruits(filename):
             # Get fruit type
             fruit_type = session.query(FruitType).filter_by(name=row['fruit_type']).first()
             if not fruit_type:
-                print(f"Warning: Fruit type {row['fruit_type']} not found")
+                logger.warning("Fruit type %s not found", row['fruit_type'])
                 continue
             
             fruit = Fruit(
@@ -67,19 +73,20 @@ def load_recipes(filename):
                 if fruit_type:
                     recipe.fruit_types.append(fruit_type)
                 else:
-                    print(f"Warning: Fruit type {ft_name} not found")
+                    logger.warning("Fruit type %s not found", ft_name)
             
             session.add(recipe)
     session.commit()
 
 def init_db():    
     # Load new data
-    #load_fruit_types('./sample_data/fruit_types.csv')
-    load_fruits('./sample_data/new_fruits.csv')
-    #load_recipes('./sample_data/recipes.csv')
+    #load_fruit_types(os.path.join(SAMPLE_DATA, 'fruit_types.csv'))
+    load_fruits(os.path.join(SAMPLE_DATA, 'new_fruits.csv'))
+    #load_recipes(os.path.join(SAMPLE_DATA, 'recipes.csv'))
 
 
 
 if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
     init_db()
-    print("Database initialized successfully!")
\ No newline at end of file
+    logger.info("Database initialized successfully!")
\ No newline at end of file
@@ -0,0 +1,114 @@
+# File: app/bench_lookups.py
+# Cost of reading the lookup-backed names (Service.asn, Service.country,
+# Fruit.country_of_origin) on list pages. "name columns" compares the mapped
+# attributes, which run a correlated subquery per row, with outer joins on
+# the lookup tables. "get_services page" compares the page as it was built
+# from Service entities with the row query it now uses; most of that gain
+# is from skipping the entities, not from the joins.
+#
+#   python -m app.bench_lookups [rows]
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, select
+from sqlalchemy.orm import joinedload, load_only, sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.migrate import upgrade
+from app.models import FruitType, Fruit, Owner, Service
+
+COUNTRIES = ["Spain", "Chile", "Peru", "India", "Kenya", "Japan", "Italy", "Ghana"]
+
+def seed(db, rows):
+    fruit_types = [FruitType(name=f"type-{i}") for i in range(10)]
+    owners = [Owner(name=f"owner-{i}") for i in range(10)]
+    db.add_all(fruit_types + owners)
+    db.flush()
+    fruits = [
+        Fruit(name=f"fruit-{i}", country_of_origin=COUNTRIES[i % len(COUNTRIES)],
+              date_picked=datetime(2024, 1, 1), fruit_type_id=fruit_types[i % 10].id)
+        for i in range(rows)
+    ]
+    db.add_all(fruits)
+    db.flush()
+    db.add_all(
+        Service(ip=f"10.{i // 65536 % 256}.{i // 256 % 256}.{i % 256}", port=80,
+                asn=f"AS{i % 200}", country=COUNTRIES[i % len(COUNTRIES)],
+                domain=f"host{i}.example.com", fruit_id=fruits[i].id,
+                owner_id=owners[i % 10].id)
+        for i in range(rows)
+    )
+    db.commit()
+
+# The service page as it read the names before: through the mapped attributes
+def subquery_services(db, limit):
+    total = crud._total(db, Service, [])
+    rows = db.execute(
+        select(Service, crud._preview(Service.banner_data).label("banner_preview"))
+        .options(
+            load_only(Service.id, Service.ip, Service.port, Service.asn, Service.country,
+                      Service.domain, Service.fruit_id, Service.owner_id, Service.timestamp,
+                      raiseload=True),
+            joinedload(Service.fruit).load_only(Fruit.id, Fruit.name, raiseload=True),
+            joinedload(Service.owner).load_only(Owner.id, Owner.name, raiseload=True),
+        )
+        .limit(limit)
+    ).all()
+    items = []
+    for service, banner_preview in rows:
+        item = schemas.ServiceSummary.model_validate(service)
+        item.banner_preview = banner_preview
+        items.append(item)
+    return schemas.ServiceSummaryList(items=items, total=total, page=1, size=limit)
+
+def subquery_names(db, limit):
+    return db.execute(
+        select(Service.id, Service.asn, Service.country).limit(limit)
+    ).all()
+
+def joined_names(db, limit):
+    return db.execute(
+        crud._join_lookups(
+            select(Service.id, crud._service_asn.name, crud._service_country.name),
+            crud._SERVICE_LOOKUPS
+        ).limit(limit)
+    ).all()
+
+def measure(db, func, limit, repeat):
+    """Best time of `repeat` calls; the page is ORM-bound, so the mean is noisy."""
+    func(db, limit)
+    db.expunge_all()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(db, limit)
+        best = min(best, time.perf_counter() - start)
+        db.expunge_all()
+    return best
+
+def main(rows=5000):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    upgrade(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, rows)
+
+    limit = min(rows, 1000)
+    cases = [
+        ("name columns", subquery_names, joined_names),
+        ("get_services page", subquery_services,
+         lambda db, limit: crud.get_services(db, limit=limit)),
+    ]
+    print(f"{limit} rows per page")
+    print(f"{'case':<20} {'before ms':>10} {'after ms':>9} {'speedup':>8}")
+    for name, before, after in cases:
+        before_time = measure(db, before, limit, 50)
+        after_time = measure(db, after, limit, 50)
+        print(f"{name:<20} {before_time * 1e3:>10.2f} {after_time * 1e3:>9.2f} "
+              f"{before_time / after_time:>7.2f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
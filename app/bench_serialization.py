@@ -0,0 +1,96 @@
+# File: app/bench_serialization.py
+# Per-row cost of the JSON list endpoints at 10k-row pages: the pydantic path
+# (crud list -> response_model validation -> jsonable_encoder) against the
+# row-to-JSON fast path.
+#
+#   python -m app.bench_serialization [rows]
+import json
+import sys
+import time
+from datetime import datetime
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.migrate import upgrade
+from app.models import FruitType, Fruit, Recipe
+
+def seed(db, rows):
+    fruit_types = [FruitType(name=f"type-{i}", description=f"fruit type {i}") for i in range(rows)]
+    db.add_all(fruit_types)
+    db.flush()
+    db.add_all(
+        Fruit(
+            name=f"fruit-{i}",
+            country_of_origin="Spain",
+            date_picked=datetime(2024, 1, 1),
+            fruit_type_id=fruit_types[i % 50].id
+        )
+        for i in range(rows)
+    )
+    for i in range(rows):
+        recipe = Recipe(
+            name=f"recipe-{i}",
+            description="A refreshing mix of seasonal fruits",
+            instructions="1. Wash all fruits\n2. Cut into bite-sized pieces\n3. Mix",
+            preparation_time=15
+        )
+        recipe.fruit_types = [fruit_types[i % 50], fruit_types[(i + 1) % 50]]
+        db.add(recipe)
+    db.commit()
+
+def pydantic_path(list_func, response_model):
+    """What FastAPI does for a response_model route returning the crud result."""
+    adapter = TypeAdapter(response_model)
+    def run(db, limit):
+        result = list_func(db, limit=limit)
+        value = adapter.validate_python(result)
+        return json.dumps(jsonable_encoder(adapter.dump_python(value, mode="json"))).encode()
+    return run
+
+def fast_path(json_func):
+    def run(db, limit):
+        return json_func(db, limit=limit)
+    return run
+
+def measure(run, db, rows, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        db.expunge_all()
+        start = time.perf_counter()
+        body = run(db, rows)
+        best = min(best, time.perf_counter() - start)
+    return best, body
+
+def main(rows=10_000):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    upgrade(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db, rows)
+
+    cases = [
+        ("fruit types", pydantic_path(crud.get_fruit_types, schemas.FruitTypeList),
+         fast_path(crud.get_fruit_types_json)),
+        ("fruits", pydantic_path(crud.get_fruits, schemas.FruitSummaryList),
+         fast_path(crud.get_fruits_json)),
+        ("recipes", pydantic_path(crud.get_recipes, schemas.RecipeSummaryList),
+         fast_path(crud.get_recipes_json)),
+    ]
+    print(f"{'endpoint':<12} {'pydantic us/row':>16} {'fast us/row':>12} {'speedup':>8}")
+    for name, slow, fast in cases:
+        slow_time, slow_body = measure(slow, db, rows)
+        fast_time, fast_body = measure(fast, db, rows)
+        # Both paths must return the same page for the comparison to hold
+        if json.loads(slow_body) != json.loads(fast_body):
+            raise SystemExit(f"{name}: the fast path returns a different page")
+        print(f"{name:<12} {slow_time / rows * 1e6:>16.1f} {fast_time / rows * 1e6:>12.1f} "
+              f"{slow_time / fast_time:>7.1f}x")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,122 @@
+# File: app/bench_statements.py
+# Per-call overhead of the crud read paths before (legacy Query API, as the
+# functions were written before the port) and after (2.0 select() / lambda
+# statements). A small table keeps SQLite's own work negligible, so the
+# numbers are dominated by statement construction, compilation-cache lookup
+# and result processing. Since the list pages moved to summary rows,
+# get_services and get_fruits also do less work per row than their legacy
+# versions, so their speedups are not from statement caching alone.
+#
+#   python -m app.bench_statements [calls]
+import sys
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine.default import CACHE_HIT
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from app import crud, schemas
+from app.migrate import upgrade
+from app.models import User, FruitType, Fruit, Owner, Service
+
+def seed(db):
+    db.add_all(User(username=f"user{i}", email=f"user{i}@example.com", password_hash="x")
+               for i in range(50))
+    fruit_types = [FruitType(name=f"type-{i}") for i in range(5)]
+    owners = [Owner(name=f"owner-{i}") for i in range(5)]
+    db.add_all(fruit_types + owners)
+    db.flush()
+    fruits = [
+        Fruit(name=f"fruit-{i}", country_of_origin="Spain", date_picked=datetime(2024, 1, 1),
+              fruit_type_id=fruit_types[i % 5].id)
+        for i in range(50)
+    ]
+    db.add_all(fruits)
+    db.flush()
+    db.add_all(
+        Service(ip=f"10.0.0.{i}", port=80, asn="AS15169", country="Spain",
+                domain=f"host{i}.example.com", fruit_id=fruits[i % 50].id,
+                owner_id=owners[i % 5].id)
+        for i in range(50)
+    )
+    db.commit()
+
+# Legacy implementations, as they were before the port
+def legacy_get_user_by_username(db, username):
+    return db.query(User).filter(User.username == username).first()
+
+def legacy_get_services(db, skip=0, limit=100, owner_id=None, ip=None):
+    query = db.query(Service)
+    if owner_id:
+        query = query.filter(Service.owner_id == owner_id)
+    if ip:
+        query = query.filter(Service.ip.ilike(f"%{ip}%"))
+    total = query.count()
+    services = query.offset(skip).limit(limit).all()
+    return schemas.ServiceList(items=services, total=total, page=(skip // limit) + 1, size=limit)
+
+def legacy_get_fruits(db, skip=0, limit=100, fruit_type_id=None, country=None):
+    query = db.query(Fruit)
+    if fruit_type_id:
+        query = query.filter(Fruit.fruit_type_id == fruit_type_id)
+    if country:
+        query = query.filter(Fruit.country_of_origin == country)
+    total = query.count()
+    fruits = query.order_by(Fruit.name).offset(skip).limit(limit).all()
+    return schemas.FruitList(
+        items=[schemas.FruitResponse.model_validate(f) for f in fruits],
+        total=total,
+        page=skip // limit + 1,
+        size=limit,
+        pages=(total + limit - 1) // limit
+    )
+
+def measure(db, func, calls, misses, rounds=5):
+    """Best per-call time over `rounds` rounds of `calls` calls, and cache misses."""
+    func(db, 0)  # warm the compiled cache
+    misses.clear()
+    best = float("inf")
+    for _ in range(rounds):
+        start = time.perf_counter()
+        for i in range(calls):
+            func(db, i)
+        best = min(best, (time.perf_counter() - start) / calls)
+    return best, len(misses)
+
+def main(calls=2000):
+    engine = create_engine(
+        "sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool
+    )
+    upgrade(engine)
+    db = sessionmaker(bind=engine)()
+    seed(db)
+
+    misses = []
+    @event.listens_for(engine, "before_cursor_execute")
+    def _count_misses(conn, cursor, statement, parameters, context, executemany):
+        # Statements compiled for this call rather than served from the cache
+        if context.cache_hit is not CACHE_HIT:
+            misses.append(statement)
+
+    cases = [
+        ("get_user_by_username",
+         lambda db, i: legacy_get_user_by_username(db, f"user{i % 50}"),
+         lambda db, i: crud.get_user_by_username(db, f"user{i % 50}")),
+        ("get_services",
+         lambda db, i: legacy_get_services(db, limit=10, owner_id=i % 5 + 1),
+         lambda db, i: crud.get_services(db, limit=10, owner_id=i % 5 + 1)),
+        ("get_fruits",
+         lambda db, i: legacy_get_fruits(db, limit=10, fruit_type_id=i % 5 + 1),
+         lambda db, i: crud.get_fruits(db, limit=10, fruit_type_id=i % 5 + 1)),
+    ]
+    print(f"{'function':<22} {'before us':>10} {'after us':>10} {'speedup':>8} {'cache misses':>13}")
+    for name, before, after in cases:
+        before_time, before_misses = measure(db, before, calls, misses)
+        after_time, after_misses = measure(db, after, calls, misses)
+        print(f"{name:<22} {before_time * 1e6:>10.1f} {after_time * 1e6:>10.1f} "
+              f"{before_time / after_time:>7.2f}x {before_misses:>6}/{after_misses:<6}")
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
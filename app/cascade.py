@@ -0,0 +1,187 @@
+# File: app/cascade.py
+# Set-based cascading deletes for owners, fruits and fruit types.
+#
+# Every foreign key pointing at a deletable parent has a policy:
+#
+#   restrict  refuse the delete while child rows exist
+#   set_null  detach the children (nullable keys only)
+#   delete    delete the children, applying their own policies first
+#
+# Policies are checked up front with EXISTS queries. Deletes then walk the
+# relationships depth first in chunks of CHUNK_SIZE ids: no ORM objects are
+# loaded, and the counters, search documents, trigram rows and stored filter
+# results of the deleted rows are refreshed the way the flush hooks would.
+# `impact` reports what a delete would do without writing anything.
+from collections import defaultdict
+from typing import Dict, Iterable, List, Mapping, NamedTuple, Optional
+
+from sqlalchemy import Table, delete, exists, func, select, update
+from sqlalchemy.orm import Session
+
+from app import counters, filter_results, search, trigram
+from app.config import settings
+from app.models import Fruit, FruitType, Owner, Service, fruit_type_recipe
+
+RESTRICT = "restrict"
+SET_NULL = "set_null"
+DELETE = "delete"
+POLICIES = (RESTRICT, SET_NULL, DELETE)
+
+class Rule(NamedTuple):
+    parent: type
+    child: object  # mapped class, or an association table
+    foreign_key: object
+    policy: str
+
+# "child_table.foreign_key" -> rule with its default policy; settings.CASCADE_POLICIES
+# and per-call overrides replace the defaults
+RULES = {
+    "services.owner_id": Rule(Owner, Service, Service.owner_id, RESTRICT),
+    "services.fruit_id": Rule(Fruit, Service, Service.fruit_id, SET_NULL),
+    "fruits.fruit_type_id": Rule(FruitType, Fruit, Fruit.fruit_type_id, RESTRICT),
+    "fruit_type_recipe.fruit_type_id": Rule(
+        FruitType, fruit_type_recipe, fruit_type_recipe.c.fruit_type_id, RESTRICT
+    ),
+}
+
+CHUNK_SIZE = 500
+
+_SEARCH_TYPES = {model: name for name, (_, model, *_rest) in search.DOCUMENT_TYPES.items()}
+_TRIGRAM_MODELS = {model for model, _ in trigram.TRIGRAM_TABLES.values()}
+
+class Restricted(Exception):
+    """A restrict policy blocked the delete."""
+
+def policies(overrides: Optional[Mapping[str, str]] = None) -> Dict[str, str]:
+    """Effective policy per rule: defaults, then settings, then `overrides`."""
+    result = {key: rule.policy for key, rule in RULES.items()}
+    for key, policy in {**settings.CASCADE_POLICIES, **(overrides or {})}.items():
+        if key not in RULES:
+            raise ValueError(f"Unknown relationship {key!r}")
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown policy {policy!r} for {key}")
+        if policy == SET_NULL and not RULES[key].foreign_key.nullable:
+            raise ValueError(f"{key} cannot be set to null")
+        result[key] = policy
+    return result
+
+def _rules(model):
+    return [(key, rule) for key, rule in RULES.items() if rule.parent is model]
+
+def _table_name(child) -> str:
+    return child.name if isinstance(child, Table) else child.__tablename__
+
+def _count(db: Session, child, criterion) -> int:
+    return db.scalar(select(func.count()).select_from(child).where(criterion))
+
+def _walk_impact(db: Session, model, criterion, effective, report) -> None:
+    parent_ids = select(model.id).where(criterion)
+    for key, rule in _rules(model):
+        child_criterion = rule.foreign_key.in_(parent_ids)
+        count = _count(db, rule.child, child_criterion)
+        if not count:
+            continue
+        policy = effective[key]
+        if policy == RESTRICT:
+            report["blocked"][key] += count
+        elif policy == SET_NULL:
+            report["nullified"][key] += count
+        elif isinstance(rule.child, Table):
+            report["deleted"][rule.child.name] += count
+        else:
+            _walk_impact(db, rule.child, child_criterion, effective, report)
+    report["deleted"][model.__tablename__] += _count(db, model, criterion)
+
+def impact(
+    db: Session,
+    model,
+    ids: Iterable[int],
+    overrides: Optional[Mapping[str, str]] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Rows a delete of `ids` would remove ("deleted", per table), detach
+    ("nullified", per relationship) or be refused by ("blocked", per
+    relationship). Nothing is written.
+    """
+    report = {"deleted": defaultdict(int), "nullified": defaultdict(int),
+              "blocked": defaultdict(int)}
+    _walk_impact(db, model, model.id.in_(list(ids)), policies(overrides), report)
+    return {name: dict(counts) for name, counts in report.items()}
+
+def _check(db: Session, model, criterion, effective) -> None:
+    parent_ids = select(model.id).where(criterion)
+    for key, rule in _rules(model):
+        policy = effective[key]
+        child_criterion = rule.foreign_key.in_(parent_ids)
+        if policy == RESTRICT and db.scalar(select(exists().where(child_criterion))):
+            raise Restricted(
+                f"Cannot delete {model.__tablename__} with associated {_table_name(rule.child)}"
+            )
+        if policy == DELETE and not isinstance(rule.child, Table):
+            _check(db, rule.child, child_criterion, effective)
+
+def _child_chunks(db: Session, child, foreign_key, parent_ids: List[int]):
+    # Each chunk is deleted or detached before the next one is read
+    while True:
+        chunk = db.scalars(
+            select(child.id).where(foreign_key.in_(parent_ids)).limit(CHUNK_SIZE)
+        ).all()
+        if not chunk:
+            return
+        yield chunk
+
+def _delete_chunk(db: Session, model, ids: List[int], effective, report) -> None:
+    for key, rule in _rules(model):
+        policy = effective[key]
+        if policy == SET_NULL:
+            for chunk in _child_chunks(db, rule.child, rule.foreign_key, ids):
+                db.execute(
+                    update(rule.child)
+                    .where(rule.child.id.in_(chunk))
+                    .values({rule.foreign_key.key: None})
+                    .execution_options(synchronize_session=False)
+                )
+                report["nullified"][key] += len(chunk)
+        elif policy == DELETE and isinstance(rule.child, Table):
+            report["deleted"][rule.child.name] += db.execute(
+                delete(rule.child).where(rule.foreign_key.in_(ids))
+            ).rowcount
+        elif policy == DELETE:
+            for chunk in _child_chunks(db, rule.child, rule.foreign_key, ids):
+                _delete_chunk(db, rule.child, chunk, effective, report)
+
+    parents = counters.parents_of(db, model, ids)
+    report["deleted"][model.__tablename__] += db.execute(
+        delete(model).where(model.id.in_(ids)).execution_options(synchronize_session=False)
+    ).rowcount
+    # Core statements bypass the flush hooks
+    counters.refresh(db, **parents)
+    if model in _SEARCH_TYPES:
+        search.reindex(db, _SEARCH_TYPES[model], ids)
+    if model in _TRIGRAM_MODELS:
+        trigram.reindex(db, model, ids)
+    if model is Service:
+        filter_results.discard_services(db, ids)
+
+def delete_rows(
+    db: Session,
+    model,
+    ids: Iterable[int],
+    overrides: Optional[Mapping[str, str]] = None
+) -> Dict[str, Dict[str, int]]:
+    """
+    Delete `ids` of `model` and apply the relationship policies to their
+    children. Raises Restricted before writing anything if a restrict policy
+    applies. Returns the rows deleted and detached. The caller commits.
+    """
+    effective = policies(overrides)
+    ids = sorted(set(ids))
+    db.flush()
+    _check(db, model, model.id.in_(ids), effective)
+    report = {"deleted": defaultdict(int), "nullified": defaultdict(int),
+              "blocked": defaultdict(int)}
+    for start in range(0, len(ids), CHUNK_SIZE):
+        _delete_chunk(db, model, ids[start:start + CHUNK_SIZE], effective, report)
+    # Loaded objects may describe rows that were deleted or detached
+    db.expire_all()
+    return {name: dict(counts) for name, counts in report.items()}
@@ -0,0 +1,64 @@
+# File: app/conditional.py
+import hashlib
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy.orm import Session
+
+from app import data_versions
+
+class Validators:
+    """
+    ETag / Last-Modified validators for a response built from `tables`.
+    Computing them costs one primary-key read of `data_versions`, so a
+    matching conditional request is answered before any page query runs.
+    """
+
+    def __init__(self, etag: str, last_modified: Optional[datetime]):
+        self.etag = etag
+        self.last_modified = last_modified
+
+    @classmethod
+    def for_tables(cls, request: Request, db: Session, *tables: str, user=None) -> "Validators":
+        versions, last_modified = data_versions.get_versions(db, *tables)
+        digest = hashlib.sha1()
+        digest.update(request.url.path.encode())
+        digest.update(str(sorted(request.query_params.multi_items())).encode())
+        digest.update(str(list(zip(tables, versions))).encode())
+        if user is not None:
+            # Pages differ per user (name in the header, admin-only controls)
+            digest.update(f"{user.id}:{user.is_admin}".encode())
+        return cls(f'W/"{digest.hexdigest()}"', last_modified)
+
+    def matches(self, request: Request) -> bool:
+        """Whether the client's cached copy is still current."""
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.split(",")]
+            return "*" in tags or self.etag in tags
+
+        if_modified_since = request.headers.get("if-modified-since")
+        if if_modified_since and self.last_modified:
+            try:
+                since = parsedate_to_datetime(if_modified_since)
+            except (TypeError, ValueError):
+                return False
+            if since.tzinfo is not None:
+                since = since.astimezone(timezone.utc).replace(tzinfo=None)
+            return self.last_modified.replace(microsecond=0) <= since
+        return False
+
+    def apply(self, response: Response) -> Response:
+        response.headers["ETag"] = self.etag
+        if self.last_modified:
+            response.headers["Last-Modified"] = format_datetime(
+                self.last_modified.replace(tzinfo=timezone.utc), usegmt=True
+            )
+        response.headers["Cache-Control"] = "private, no-cache"
+        response.headers["Vary"] = "Cookie"
+        return response
+
+    def not_modified(self) -> Response:
+        return self.apply(Response(status_code=status.HTTP_304_NOT_MODIFIED))
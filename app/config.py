@@ -1,7 +1,7 @@
 from functools import lru_cache
 from pydantic_settings import BaseSettings
 import os
-from typing import Optional, List
+from typing import Dict, Optional, List
 
 class Settings(BaseSettings):
     # Base Configuration
@@ -16,6 +16,13 @@ class Settings(BaseSettings):
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-here-change-in-production")
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
+    PRINCIPAL_CACHE_TTL: int = 60  # seconds
+    PRINCIPAL_CACHE_SIZE: int = 4096
+    
+    # Password hashing
+    BCRYPT_ROUNDS: int = 12  # existing hashes are upgraded on next login
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 32  # beyond this, requests get a 503
     
     # Security
     COOKIE_SECURE: bool = os.getenv("ENVIRONMENT", "development") == "production"
@@ -25,6 +32,40 @@ class Settings(BaseSettings):
         "http://localhost:3000",
     ]
     
+    # Caching
+    DASHBOARD_CACHE_TTL: int = 300  # seconds; writes invalidate sooner
+    REFERENCE_CACHE_TTL: int = 300  # dropdown option lists; writes invalidate sooner
+    LOOKUP_CACHE_TTL: int = 3600  # country/ASN name -> id; ids never change
+    LOOKUP_CACHE_SIZE: int = 50000
+    MEMBERSHIP_CACHE_TTL: int = 300  # group ids per user; also checked against the group_member version
+    MEMBERSHIP_CACHE_SIZE: int = 10000
+    FILTER_PLAN_CACHE_TTL: int = 3600  # compiled saved filters; keyed by modified_at, so edits miss
+    FILTER_PLAN_CACHE_SIZE: int = 1024
+    
+    # Groups
+    GROUP_MEMBERS_BATCH_LIMIT: int = 10000  # user ids per bulk membership request
+    
+    # Saved filter results
+    FILTER_REFRESH_WORKERS: int = 1  # background threads recomputing stored results
+    FILTER_WARM_INTERVAL: int = 300  # seconds between warming passes
+    FILTER_WARM_COUNT: int = 20  # most-opened shared filters kept materialized
+    FILTER_WARM_MIN_OPENS: int = 5  # opens per interval before a shared filter qualifies
+    
+    # Deletes
+    CASCADE_POLICIES: Dict[str, str] = {}  # e.g. {"services.owner_id": "set_null"}; see app/cascade.py
+    
+    # List views
+    LIST_PREVIEW_LENGTH: int = 120  # characters of banners/descriptions shown in lists
+    
+    # Logging
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"  # "json" or "text"
+    LOG_DEBUG_SAMPLE_RATE: float = 0.01  # fraction of DEBUG records kept
+    
+    # Templates
+    TEMPLATE_BYTECODE_CACHE: bool = True
+    TEMPLATE_CACHE_DIR: Optional[str] = None  # defaults to a private temp dir
+    
     # File Upload
     UPLOAD_DIRECTORY: str = "uploads"
     MAX_UPLOAD_SIZE: int = 10 * 1024 * 1024  # 10MB
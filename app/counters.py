@@ -0,0 +1,250 @@
+# File: app/counters.py
+# Denormalized relationship counters, kept exact on every write.
+#
+#   fruit_types.fruit_count   fruits per type
+#   fruit_types.recipe_count  recipes per type (fruit_type_recipe rows)
+#   owners.service_count      services per owner
+#   fruits.service_count      services per fruit
+#
+# Flushes apply deltas: +1 to the parent of every inserted child or new
+# foreign key value, -1 to the parent of every deleted child or old foreign
+# key value, in one UPDATE per (counter, delta) inside the same transaction.
+# Writing a child therefore costs the same however many siblings it has.
+# Core and bulk statements bypass the unit of work and must call `refresh`,
+# which recomputes counters from the child tables; `reconcile` does that for
+# every row and repairs any drift.
+from collections import Counter, defaultdict
+from itertools import chain
+from typing import Dict, Iterable, Optional, Set
+
+from sqlalchemy import event, func, inspect, or_, select, update
+from sqlalchemy.orm.base import NO_VALUE
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.models import Fruit, FruitType, Owner, Recipe, Service, fruit_type_recipe
+
+# Chunk size for IN lists, well under SQLite's bound-parameter limit
+CHUNK_SIZE = 500
+
+def _count(column, parent_id):
+    return select(func.count()).where(column == parent_id).scalar_subquery()
+
+# counter name -> (parent model, counter column values keyed by attribute)
+COUNTERS = {
+    "fruit_types": (FruitType, {
+        "fruit_count": lambda: _count(Fruit.fruit_type_id, FruitType.id),
+        "recipe_count": lambda: _count(fruit_type_recipe.c.fruit_type_id, FruitType.id),
+    }),
+    "owners": (Owner, {
+        "service_count": lambda: _count(Service.owner_id, Owner.id),
+    }),
+    "fruits": (Fruit, {
+        "service_count": lambda: _count(Service.fruit_id, Fruit.id),
+    }),
+}
+
+# child model, foreign key attribute, relationship -> parent counter table, counter
+_FOREIGN_KEYS = (
+    (Fruit, "fruit_type_id", "fruit_type", "fruit_types", "fruit_count"),
+    (Service, "owner_id", "owner", "owners", "service_count"),
+    (Service, "fruit_id", "fruit", "fruits", "service_count"),
+)
+
+def _chunks(ids: Iterable[int]):
+    ids = sorted(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+def _statement(table: str, where=None):
+    model, columns = COUNTERS[table]
+    statement = update(model).values({name: value() for name, value in columns.items()})
+    if where is not None:
+        statement = statement.where(where)
+    return statement
+
+def refresh(db: Session, **ids: Optional[Iterable[int]]) -> None:
+    """
+    Recompute the counters of the given parents, e.g.
+    `refresh(db, fruit_types=[1, 2], owners=[3])`. Passing None for a table
+    recomputes every row of it.
+    """
+    connection = db.connection()
+    for table, parent_ids in ids.items():
+        model, columns = COUNTERS[table]
+        if parent_ids is None:
+            connection.execute(_statement(table))
+        else:
+            parent_ids = set(parent_ids) - {None}
+            if not parent_ids:
+                continue
+            for chunk in _chunks(parent_ids):
+                connection.execute(_statement(table, model.id.in_(chunk)))
+            _expire_loaded(db, model, parent_ids, columns)
+        data_versions.mark_changed(db, table)
+
+def _expire_loaded(db: Session, model, parent_ids: Set[int], columns) -> None:
+    """Make already-loaded parents re-read their counters on next access."""
+    for obj in list(db.identity_map.values()):
+        # The identity key, unlike obj.id, never loads (the row may be gone)
+        if isinstance(obj, model) and inspect(obj).identity[0] in parent_ids:
+            db.expire(obj, list(columns))
+
+def drift(db: Session) -> Dict[str, int]:
+    """Number of rows per counter table whose stored counters are wrong."""
+    result = {}
+    for table, (model, columns) in COUNTERS.items():
+        mismatch = [getattr(model, name) != value() for name, value in columns.items()]
+        result[table] = db.scalar(select(func.count()).select_from(model).where(or_(*mismatch)))
+    return result
+
+def reconcile(db: Session) -> Dict[str, int]:
+    """
+    Recompute every counter from the child tables. Returns the number of rows
+    per table that had drifted. The caller commits.
+    """
+    drifted = drift(db)
+    refresh(db, **{table: None for table in COUNTERS})
+    return drifted
+
+def parents_of(db: Session, model, ids: Iterable[int]) -> Dict[str, Set[int]]:
+    """
+    Counter parents of the given child rows, keyed by counter table. Read it
+    before a Core statement deletes or moves the children, then `refresh`.
+    """
+    parents = defaultdict(set)
+    for child, key, _, table, _ in _FOREIGN_KEYS:
+        if child is model:
+            column = getattr(model, key)
+            parents[table].update(
+                db.scalars(select(column).where(model.id.in_(ids), column.isnot(None)).distinct())
+            )
+    return parents
+
+def _deltas(session: Session) -> Dict[tuple, Counter]:
+    """Pending counter changes of the flush, as (table, counter) -> {parent id: delta}."""
+    return session.info.setdefault("counter_deltas", defaultdict(Counter))
+
+def _changed(state, key: str, relationship: str) -> bool:
+    return (state.attrs[key].history.has_changes()
+            or state.attrs[relationship].history.has_changes())
+
+def _stored_value(session: Session, obj, key: str):
+    """The foreign key value in the database row, before this flush."""
+    state = inspect(obj)
+    if key in state.committed_state:
+        value = state.committed_state[key]
+    elif key in state.dict:
+        value = state.dict[key]
+    else:
+        value = NO_VALUE
+    if value is NO_VALUE:
+        # Overwritten or expired without being loaded; read the row. A
+        # connection, since the session would autoflush
+        model = type(obj)
+        value = session.connection().scalar(
+            select(getattr(model, key)).where(model.id == state.identity[0])
+        )
+    return value
+
+def _record_previous(session: Session, obj, deltas, changed_only: bool) -> None:
+    # Parents losing a child: the stored foreign key of deleted rows, and of
+    # rows whose key or relationship changed
+    state = inspect(obj)
+    for model, key, relationship, table, counter in _FOREIGN_KEYS:
+        if isinstance(obj, model) and (not changed_only or _changed(state, key, relationship)):
+            parent_id = _stored_value(session, obj, key)
+            if parent_id is not None:
+                deltas[table, counter][parent_id] -= 1
+
+def _record_current(obj, deltas, changed_only: bool) -> None:
+    # Parents gaining a child: the flushed foreign key of new and moved rows
+    state = inspect(obj)
+    for model, key, relationship, table, counter in _FOREIGN_KEYS:
+        if isinstance(obj, model) and (not changed_only or _changed(state, key, relationship)):
+            parent_id = state.attrs[key].value
+            if parent_id is not None:
+                deltas[table, counter][parent_id] += 1
+
+def _links(session: Session) -> Dict[str, Set[tuple]]:
+    """(recipe, fruit type) association pairs the flush adds and removes."""
+    return session.info.setdefault("counter_links", {"added": set(), "removed": set()})
+
+def _record_links(obj, links) -> None:
+    # A change made on one side shows in the other side's history only if
+    # that collection is loaded, so both sides are read; pairs count once
+    if isinstance(obj, Recipe):
+        history = inspect(obj).attrs.fruit_types.history
+        links["added"].update((obj, fruit_type) for fruit_type in history.added)
+        links["removed"].update((obj, fruit_type) for fruit_type in history.deleted)
+    elif isinstance(obj, FruitType):
+        history = inspect(obj).attrs.recipes.history
+        links["added"].update((recipe, obj) for recipe in history.added)
+        links["removed"].update((recipe, obj) for recipe in history.deleted)
+
+def _apply(session: Session, deltas) -> None:
+    connection = session.connection()
+    for (table, counter), changes in deltas.items():
+        model, _ = COUNTERS[table]
+        column = getattr(model, counter)
+        by_delta = defaultdict(list)
+        for parent_id, delta in changes.items():
+            if delta:
+                by_delta[delta].append(parent_id)
+        if not by_delta:
+            continue
+        for delta, parent_ids in by_delta.items():
+            for chunk in _chunks(parent_ids):
+                connection.execute(
+                    update(model).where(model.id.in_(chunk)).values({counter: column + delta})
+                )
+        _expire_loaded(session, model, set(changes), [counter])
+        data_versions.mark_changed(session, table)
+
+@event.listens_for(Session, "before_flush")
+def _collect_previous_parents(session, flush_context, instances):
+    deltas = _deltas(session)
+    for obj in session.dirty:
+        if isinstance(obj, (Fruit, Service)):
+            _record_previous(session, obj, deltas, changed_only=True)
+    for obj in session.deleted:
+        if isinstance(obj, (Fruit, Service)):
+            _record_previous(session, obj, deltas, changed_only=False)
+        elif isinstance(obj, Recipe):
+            # The association rows go with the recipe; load them while they exist
+            history = inspect(obj).attrs.fruit_types.load_history()
+            _links(session)["removed"].update(
+                (obj, fruit_type) for fruit_type in chain(history.unchanged, history.deleted)
+            )
+
+@event.listens_for(Session, "after_flush")
+def _apply_counter_deltas(session, flush_context):
+    deltas = _deltas(session)
+    links = _links(session)
+    for obj in session.new:
+        _record_current(obj, deltas, changed_only=False)
+        _record_links(obj, links)
+    for obj in session.dirty:
+        _record_current(obj, deltas, changed_only=True)
+        _record_links(obj, links)
+    recipe_counts = deltas["fruit_types", "recipe_count"]
+    for _, fruit_type in links["added"]:
+        recipe_counts[fruit_type.id] += 1
+    for _, fruit_type in links["removed"]:
+        recipe_counts[fruit_type.id] -= 1
+    del session.info["counter_links"]
+
+    # Deleted parents have no row left to update
+    for obj in session.deleted:
+        for table, (model, _) in COUNTERS.items():
+            if isinstance(obj, model):
+                for (delta_table, _), changes in deltas.items():
+                    if delta_table == table:
+                        changes.pop(inspect(obj).identity[0], None)
+
+    _apply(session, session.info.pop("counter_deltas"))
+
+@event.listens_for(Session, "after_rollback")
+def _discard_pending(session):
+    session.info.pop("counter_deltas", None)
+    session.info.pop("counter_links", None)
@@ -1,6 +1,5 @@
-from sqlalchemy.orm import Session
-from sqlalchemy import and_, or_
-from sqlalchemy import func
+from sqlalchemy.orm import Session, make_transient_to_detached, aliased, load_only, selectinload
+from sqlalchemy import Text, case, delete, exists, null, func, insert, literal, select, update, lambda_stmt
 
 from fastapi import UploadFile, HTTPException
 import csv
@@ -8,30 +7,140 @@ from datetime import datetime
 from typing import List, Optional, Dict
 from io import StringIO
 import json
+import logging
 
 from app.models import User, FruitType, Fruit, Recipe, Group, SavedFilter, Service, Owner
-from passlib.hash import bcrypt
+from app.models import Asn, Country, FilterAccess
+from app.models import fruit_type_recipe, group_member
 from app import schemas
-from .schemas import ServiceList, ServiceResponse
+# Imported for their flush hooks, which keep counters and search documents current
+from app import counters, search  # noqa: F401
+from app import cascade, filter_access, filter_dsl, filter_results, memberships, recipe_matching, recipe_search, trigram
+from app.serialization import RowEncoder, dump_page
+from app import passwords
+from app.config import settings
+from app.utils.cache import TTLCache
+from .schemas import ServiceResponse
+
+# Authenticated users keyed by access token signature, shared by the auth
+# middleware and the get_current_user dependency.
+principal_cache = TTLCache(
+    ttl=settings.PRINCIPAL_CACHE_TTL,
+    maxsize=settings.PRINCIPAL_CACHE_SIZE
+)
+
+logger = logging.getLogger(__name__)
+
+# Lookup-backed names in list queries. The mapped attributes (Service.asn,
+# Service.country, Fruit.country_of_origin) read through a correlated
+# subquery per row; lists outer-join the lookup tables instead.
+_service_asn = aliased(Asn)
+_service_country = aliased(Country)
+_fruit_country = aliased(Country)
+_SERVICE_LOOKUPS = ((_service_asn, Service.asn_id), (_service_country, Service.country_id))
+_FRUIT_LOOKUPS = ((_fruit_country, Fruit.country_id),)
+
+def _join_lookups(statement, lookups):
+    for lookup, foreign_key in lookups:
+        statement = statement.outerjoin(lookup, lookup.id == foreign_key)
+    return statement
+
+# Row encoders for the JSON list fast paths; each is checked against its
+# response schema once, here, rather than per row.
+_fruit_type_encoder = RowEncoder(schemas.FruitTypeResponse, [
+    FruitType.id, FruitType.name, FruitType.description,
+    FruitType.fruit_count, FruitType.recipe_count
+])
+
+# List views load only the columns their summaries show. Heavy text columns
+# (banners, HTTP data, recipe bodies) stay on disk and are loaded in full by
+# the detail getters; recipe entities raise instead of lazy loading them.
+# The pydantic and JSON list routes share these encoders, so both return
+# the same summary shape.
+_service_summary_encoder = RowEncoder(schemas.ServiceSummary, [
+    Service.id, Service.ip, Service.port, _service_asn.name.label("asn"),
+    _service_country.name.label("country"), Service.domain, Service.fruit_id,
+    Service.owner_id, Service.timestamp
+], nested=('banner_preview', 'fruit', 'owner'))
+_fruit_summary_encoder = RowEncoder(schemas.FruitSummary, [
+    Fruit.id, Fruit.name, _fruit_country.name.label("country_of_origin"), Fruit.date_picked,
+    Fruit.fruit_type_id, Fruit.service_count
+], nested=('fruit_type', 'services'))
+_recipe_summary_encoder = RowEncoder(schemas.RecipeSummary, [
+    Recipe.id, Recipe.name, Recipe.preparation_time, Recipe.created_at
+], nested=('description_preview', 'snippet', 'fruit_types'))
+_fruit_ref_encoder = RowEncoder(schemas.NamedRef, [Fruit.id, Fruit.name])
+_fruit_type_ref_encoder = RowEncoder(schemas.NamedRef, [FruitType.id, FruitType.name])
+_owner_ref_encoder = RowEncoder(schemas.NamedRef, [Owner.id, Owner.name])
+_RECIPE_LIST_OPTIONS = (
+    load_only(Recipe.id, Recipe.name, Recipe.preparation_time, Recipe.created_at, raiseload=True),
+    selectinload(Recipe.fruit_types).load_only(FruitType.id, FruitType.name, raiseload=True),
+)
+
+def _preview(column):
+    """The start of a text column, cut to LIST_PREVIEW_LENGTH characters in SQL."""
+    length = settings.LIST_PREVIEW_LENGTH
+    return case(
+        (func.length(column) > length, func.substr(column, 1, length, type_=Text) + "…"),
+        else_=column
+    )
 
 
 # User operations
+# Read paths build 2.0-style select() statements: values are bound
+# parameters, so each statement shape is compiled once and then served from
+# the engine's compiled cache. Fixed-shape lookups use lambda statements,
+# which also skip rebuilding the statement on every call, and the list
+# pages extend base statements built once at import.
+def _total(db: Session, model, criteria) -> int:
+    """Row count for a list page, without wrapping the page query in a subquery."""
+    return db.scalar(select(func.count()).select_from(model).where(*criteria))
+
 def get_user(db: Session, user_id: int) -> Optional[User]:
-    return db.query(User).filter(User.id == user_id).first()
+    return db.get(User, user_id)
 
 def get_user_by_username(db: Session, username: str) -> Optional[User]:
-    return db.query(User).filter(User.username == username).first()
+    return db.scalars(
+        lambda_stmt(lambda: select(User).where(User.username == username).limit(1))
+    ).first()
 
 def get_user_by_email(db: Session, email: str) -> Optional[User]:
-    return db.query(User).filter(User.email == email).first()
+    return db.scalars(
+        lambda_stmt(lambda: select(User).where(User.email == email).limit(1))
+    ).first()
+
+def get_principal(db: Session, username: str, token_signature: str) -> Optional[User]:
+    """
+    Get the user behind a verified access token.
+    Served from the principal cache when possible; the cached row is attached
+    to `db` without emitting a query.
+    """
+    snapshot = principal_cache.get(token_signature)
+    if snapshot is None:
+        user = get_user_by_username(db, username)
+        if user is None:
+            return None
+        principal_cache.set(
+            token_signature,
+            {column.key: getattr(user, column.key) for column in User.__table__.columns}
+        )
+        return user
+
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return db.merge(user, load=False)
 
-def create_user(db: Session, user: schemas.UserCreate) -> User:
+def invalidate_principal(user_id: int) -> None:
+    """Drop cached principals for a user after their row changes."""
+    principal_cache.discard_where(lambda snapshot: snapshot["id"] == user_id)
+
+async def create_user(db: Session, user: schemas.UserCreate) -> User:
     if get_user_by_username(db, user.username):
         raise HTTPException(400, "Username already registered")
     if get_user_by_email(db, user.email):
         raise HTTPException(400, "Email already registered")
     
-    hashed_password = bcrypt.hash(user.password)
+    hashed_password = await passwords.hash_password(user.password)
     db_user = User(
         username=user.username,
         email=user.email,
@@ -43,7 +152,7 @@ def create_user(db: Session, user: schemas.UserCreate) -> User:
     db.refresh(db_user)
     return db_user
 
-def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> User:
+async def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> User:
     db_user = get_user(db, user_id)
     if not db_user:
         raise HTTPException(404, "User not found")
@@ -55,21 +164,50 @@ def update_user(db: Session, user_id: int, user_update: schemas.UserUpdate) -> U
         db_user.email = user_update.email
     
     if user_update.password:
-        db_user.password_hash = bcrypt.hash(user_update.password)
+        db_user.password_hash = await passwords.hash_password(user_update.password)
+    
+    db.commit()
+    invalidate_principal(user_id)
+    db.refresh(db_user)
+    return db_user
+
+async def verify_password(db: Session, user_id: int, password: str) -> bool:
+    db_user = get_user(db, user_id)
+    if not db_user:
+        return False
+    valid, _ = await passwords.verify_password(password, db_user.password_hash)
+    return valid
+
+async def update_password(db: Session, user_id: int, new_password: str) -> User:
+    db_user = get_user(db, user_id)
+    if not db_user:
+        raise HTTPException(404, "User not found")
     
+    db_user.password_hash = await passwords.hash_password(new_password)
     db.commit()
+    invalidate_principal(user_id)
     db.refresh(db_user)
     return db_user
 
-def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
+async def authenticate_user(db: Session, username: str, password: str) -> Optional[User]:
     user = get_user_by_username(db, username)
-    if not user or not bcrypt.verify(password, user.password_hash):
+    if not user:
         return None
+    
+    valid, new_hash = await passwords.verify_password(password, user.password_hash)
+    if not valid:
+        return None
+    
+    # Transparently upgrade hashes made with an old cost factor
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+        invalidate_principal(user.id)
     return user
 
 # FruitType operations
 def get_fruit_type(db: Session, fruit_type_id: int) -> Optional[FruitType]:
-    return db.query(FruitType).filter(FruitType.id == fruit_type_id).first()
+    return db.get(FruitType, fruit_type_id)
 
 def get_fruit_types(
     db: Session,
@@ -77,39 +215,47 @@ def get_fruit_types(
     limit: int = 100,
     search: Optional[str] = None
 ) -> schemas.FruitTypeList:
-    query = db.query(
-        FruitType,
-        func.count(Fruit.id).label('fruit_count')
-    ).outerjoin(Fruit)
+    query = select(FruitType)
     
     if search:
         search = f"%{search}%"
-        query = query.filter(FruitType.name.ilike(search) | 
-                           FruitType.description.ilike(search))
+        query = query.where(FruitType.name.ilike(search) | 
+                            FruitType.description.ilike(search))
     
-    # Group by and order by fruit count
-    query = query.group_by(FruitType.id).order_by(func.count(Fruit.id).desc())
+    # Order by the maintained fruit count (indexed), no join needed
+    query = query.order_by(FruitType.fruit_count.desc(), FruitType.id)
     
-    total = db.query(FruitType).count()
-    items = query.offset(skip).limit(limit).all()
-    
-    # Convert to response objects with fruit count
-    fruit_types = []
-    for ft, count in items:
-        ft_dict = schemas.FruitTypeResponse.model_validate(ft)
-        ft_dict.fruit_count = count
-        fruit_types.append(ft_dict)
+    total = _total(db, FruitType, ())
+    items = db.scalars(query.offset(skip).limit(limit)).all()
 
     return schemas.FruitTypeList(
-        items=fruit_types,
+        items=[schemas.FruitTypeResponse.model_validate(ft) for ft in items],
         total=total,
         page=skip // limit + 1,
         size=limit,
         pages=(total + limit - 1) // limit
     )
 
+def get_fruit_types_json(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None
+) -> bytes:
+    """Same page as get_fruit_types, encoded straight from SQL rows to JSON."""
+    query = (select(*_fruit_type_encoder.columns)
+             .order_by(FruitType.fruit_count.desc(), FruitType.id))
+    if search:
+        search = f"%{search}%"
+        query = query.where(FruitType.name.ilike(search) |
+                            FruitType.description.ilike(search))
+    
+    total = db.scalar(select(func.count()).select_from(FruitType))
+    rows = db.execute(query.offset(skip).limit(limit)).all()
+    return dump_page(_fruit_type_encoder.encode_rows(rows), total, skip, limit)
+
 def create_fruit_type(db: Session, fruit_type: schemas.FruitTypeCreate) -> FruitType:
-    if db.query(FruitType).filter(FruitType.name == fruit_type.name).first():
+    if db.scalar(select(exists().where(FruitType.name == fruit_type.name))):
         raise HTTPException(400, "Fruit type name already exists")
     
     db_fruit_type = FruitType(**fruit_type.dict())
@@ -134,62 +280,215 @@ def update_fruit_type(
     db.refresh(db_fruit_type)
     return db_fruit_type
 
-def delete_fruit_type(db: Session, fruit_type_id: int) -> bool:
-    db_fruit_type = get_fruit_type(db, fruit_type_id)
-    if db_fruit_type:
-        db.delete(db_fruit_type)
-        db.commit()
-        return True
-    return False
+def _cascade_delete(
+    db: Session,
+    model,
+    object_id: int,
+    overrides: Optional[Dict[str, str]] = None,
+    dry_run: bool = False
+) -> Optional[dict]:
+    """
+    Delete one row and its dependents per the app.cascade policies, or with
+    `dry_run` only report what would be deleted. None if the row is missing.
+    """
+    if db.get(model, object_id) is None:
+        return None
+    try:
+        if dry_run:
+            return cascade.impact(db, model, [object_id], overrides)
+        report = cascade.delete_rows(db, model, [object_id], overrides)
+    except cascade.Restricted as e:
+        raise HTTPException(400, str(e))
+    db.commit()
+    return report
+
+def delete_fruit_type(
+    db: Session,
+    fruit_type_id: int,
+    force: bool = False,
+    dry_run: bool = False
+) -> Optional[dict]:
+    """
+    Delete a fruit type. Types with fruits or recipes are refused unless
+    `force`, which deletes their fruits and recipe links too.
+    """
+    overrides = None
+    if force:
+        overrides = {
+            "fruits.fruit_type_id": cascade.DELETE,
+            "fruit_type_recipe.fruit_type_id": cascade.DELETE,
+        }
+    return _cascade_delete(db, FruitType, fruit_type_id, overrides, dry_run)
+
+def merge_fruit_types(db: Session, source_id: int, target_id: int) -> dict:
+    """
+    Move every fruit and recipe of one fruit type to another and delete the
+    source type. Runs as one transaction of set-based statements, so no
+    fruit or recipe is loaded whatever the size of the types.
+    """
+    if source_id == target_id:
+        raise HTTPException(400, "Cannot merge a fruit type with itself")
+    if not get_fruit_type(db, source_id) or not get_fruit_type(db, target_id):
+        raise HTTPException(404, "Fruit type not found")
+    
+    fruits_moved = db.execute(
+        update(Fruit)
+        .where(Fruit.fruit_type_id == source_id)
+        .values(fruit_type_id=target_id)
+        .execution_options(synchronize_session=False)
+    ).rowcount
+    
+    # Link the target to the source's recipes it does not already have, then
+    # drop all of the source's links; recipes linked to both keep one link
+    links = fruit_type_recipe.c
+    recipes_moved = db.execute(
+        insert(fruit_type_recipe).from_select(
+            ["fruit_type_id", "recipe_id"],
+            select(literal(target_id), links.recipe_id)
+            .where(
+                links.fruit_type_id == source_id,
+                links.recipe_id.not_in(
+                    select(links.recipe_id).where(links.fruit_type_id == target_id)
+                )
+            )
+            .distinct()
+        )
+    ).rowcount
+    recipe_links_removed = db.execute(
+        delete(fruit_type_recipe).where(links.fruit_type_id == source_id)
+    ).rowcount
+    
+    db.execute(
+        delete(FruitType)
+        .where(FruitType.id == source_id)
+        .execution_options(synchronize_session=False)
+    )
+    
+    # Core statements bypass the flush hooks
+    counters.refresh(db, fruit_types=[target_id])
+    search.reindex(db, "fruit_type", [source_id])
+    db.commit()
+    
+    return {
+        "target": get_fruit_type(db, target_id),
+        "fruits_moved": fruits_moved,
+        "recipes_moved": recipes_moved,
+        "duplicate_recipe_links_removed": recipe_links_removed - recipes_moved,
+    }
 
 # Fruit operations
 def get_fruit(db: Session, fruit_id: int) -> Optional[Fruit]:
-    return db.query(Fruit).filter(Fruit.id == fruit_id).first()
+    return db.get(Fruit, fruit_id)
 
-def get_fruits(
-    db: Session,
-    skip: int = 0,
-    limit: int = 100,
+def _lookup_id(lookup, name: str):
+    """Id of a lookup name, as a subquery so equality filters use the id index."""
+    return select(lookup.id).where(lookup.name == name).scalar_subquery()
+
+def _fruit_filters(
     fruit_type_id: Optional[int] = None,
     country: Optional[str] = None,
     search: Optional[str] = None
-) -> schemas.FruitList:
-    query = db.query(Fruit)
-    
-    # Apply filters
+) -> list:
+    criteria = []
     if fruit_type_id:
-        query = query.filter(Fruit.fruit_type_id == fruit_type_id)
+        criteria.append(Fruit.fruit_type_id == fruit_type_id)
     
     if country:
-        query = query.filter(Fruit.country_of_origin == country)
+        criteria.append(Fruit.country_id == _lookup_id(Country, country))
     
     if search:
-        search_term = f"%{search}%"
-        query = query.filter(
-            or_(
-                Fruit.name.ilike(search_term),
-                Fruit.country_of_origin.ilike(search_term)
-            )
-        )
+        criteria.append(trigram.contains(Fruit, search, Fruit.name, Fruit.country_of_origin))
+    return criteria
+
+# Sort orders for the fruit and owner lists; "services" uses the maintained
+# service_count column, so no join or GROUP BY is needed.
+_FRUIT_ORDER = {
+    "name": (Fruit.name,),
+    "services": (Fruit.service_count.desc(), Fruit.name)
+}
+_OWNER_ORDER = {
+    "name": (Owner.name,),
+    "services": (Owner.service_count.desc(), Owner.name)
+}
+
+def _order_by(orders: dict, sort: Optional[str]) -> tuple:
+    if sort is None:
+        return orders["name"]
+    if sort not in orders:
+        raise HTTPException(400, f"Invalid sort; expected one of {', '.join(orders)}")
+    return orders[sort]
+
+_FRUIT_SUMMARY_SELECT = _join_lookups(
+    select(*_fruit_summary_encoder.columns, *_fruit_type_ref_encoder.columns)
+    .join(FruitType, Fruit.fruit_type_id == FruitType.id),
+    _FRUIT_LOOKUPS
+)
+
+def _fruit_page(
+    db: Session,
+    skip: int,
+    limit: int,
+    fruit_type_id: Optional[int],
+    country: Optional[str],
+    search: Optional[str],
+    sort: Optional[str]
+) -> tuple:
+    """FruitSummary dicts for one page, with the total row count."""
+    criteria = _fruit_filters(fruit_type_id, country, search)
+    total = _total(db, Fruit, criteria)
+    rows = db.execute(
+        _FRUIT_SUMMARY_SELECT
+        .where(*criteria)
+        .order_by(*_order_by(_FRUIT_ORDER, sort))
+        .offset(skip)
+        .limit(limit)
+    ).all()
     
-    # Get total before pagination
-    total = query.count()
+    split = len(_fruit_summary_encoder.columns)
+    items = []
+    by_id = {}
+    for row in rows:
+        item = _fruit_summary_encoder.encode_row(row[:split])
+        item['fruit_type'] = _fruit_type_ref_encoder.encode_row(row[split:])
+        item['services'] = []
+        items.append(item)
+        by_id[item['id']] = item
     
-    # Apply pagination
-    fruits = query.order_by(Fruit.name).offset(skip).limit(limit).all()
-    pages = (total + limit - 1) // limit
+    if by_id:
+        for service in _service_summaries(db, [Service.fruit_id.in_(list(by_id))], (Service.id,)):
+            by_id[service['fruit_id']]['services'].append(service)
+    return items, total
 
-    return schemas.FruitList(
-        items=[schemas.FruitResponse.model_validate(f) for f in fruits],
+def get_fruits(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    fruit_type_id: Optional[int] = None,
+    country: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: Optional[str] = None
+) -> schemas.FruitSummaryList:
+    items, total = _fruit_page(db, skip, limit, fruit_type_id, country, search, sort)
+    return schemas.FruitSummaryList(
+        items=items,
         total=total,
         page=skip // limit + 1,
         size=limit,
-        pages=pages
+        pages=(total + limit - 1) // limit
     )
 
-def get_fruit_countries(db: Session) -> List[str]:
-    """Get list of all unique countries that have fruits."""
-    return [r[0] for r in db.query(Fruit.country_of_origin).distinct().all()]
+def get_fruits_json(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    fruit_type_id: Optional[int] = None,
+    country: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: Optional[str] = None
+) -> bytes:
+    """Same page as get_fruits, encoded straight from SQL rows to JSON."""
+    items, total = _fruit_page(db, skip, limit, fruit_type_id, country, search, sort)
+    return dump_page(items, total, skip, limit)
 
 def get_fruits_by_type(
     db: Session,
@@ -197,11 +496,12 @@ def get_fruits_by_type(
     skip: int = 0,
     limit: int = 100
 ) -> List[Fruit]:
-    return (db.query(Fruit)
-            .filter(Fruit.fruit_type_id == fruit_type_id)
-            .offset(skip)
-            .limit(limit)
-            .all())
+    return db.scalars(lambda_stmt(
+        lambda: select(Fruit)
+        .where(Fruit.fruit_type_id == fruit_type_id)
+        .offset(skip)
+        .limit(limit)
+    )).all()
 
 def create_fruit(db: Session, fruit: schemas.FruitCreate) -> Fruit:
     if not get_fruit_type(db, fruit.fruit_type_id):
@@ -233,17 +533,12 @@ def update_fruit(
     db.refresh(db_fruit)
     return db_fruit
 
-def delete_fruit(db: Session, fruit_id: int) -> bool:
-    db_fruit = get_fruit(db, fruit_id)
-    if db_fruit:
-        db.delete(db_fruit)
-        db.commit()
-        return True
-    return False
+def delete_fruit(db: Session, fruit_id: int, dry_run: bool = False) -> Optional[dict]:
+    return _cascade_delete(db, Fruit, fruit_id, dry_run=dry_run)
 
 # Group operations
 def get_group(db: Session, group_id: int) -> Optional[Group]:
-    return db.query(Group).filter(Group.id == group_id).first()
+    return db.get(Group, group_id)
 
 def get_groups(
     db: Session,
@@ -251,12 +546,14 @@ def get_groups(
     limit: int = 100,
     user_id: Optional[int] = None
 ) -> schemas.GroupList:
-    query = db.query(Group)
+    criteria = []
     if user_id:
-        query = query.filter(Group.members.any(id=user_id))
+        criteria.append(Group.id.in_(memberships.group_ids(db, user_id)))
     
-    total = query.count()
-    groups = query.offset(skip).limit(limit).all()
+    total = _total(db, Group, criteria)
+    groups = db.scalars(
+        select(Group).where(*criteria).order_by(Group.id).offset(skip).limit(limit)
+    ).all()
     pages = (total + limit - 1) // limit
 
     return schemas.GroupList(
@@ -275,6 +572,7 @@ def create_group(db: Session, group: schemas.GroupCreate, creator_id: int) -> Gr
     db_group = Group(**group.dict())
     db_group.members.append(creator)
     db.add(db_group)
+    memberships.changed(db, creator_id)
     db.commit()
     db.refresh(db_group)
     return db_group
@@ -296,6 +594,9 @@ def update_group(
     return db_group
 
 
+def is_user_in_group(db: Session, user_id: int, group_id: int) -> bool:
+    return memberships.is_member(db, user_id, group_id)
+
 def manage_group_members(
     db: Session,
     group_id: int,
@@ -308,18 +609,92 @@ def manage_group_members(
     if not db_group or not db_user:
         raise HTTPException(404, "Group or user not found")
     
-    if add and db_user not in db_group.members:
-        db_group.members.append(db_user)
-    elif not add and db_user in db_group.members:
-        db_group.members.remove(db_user)
+    # One index probe and a single-row write, rather than loading the
+    # group's member collection
+    is_member = db.scalar(select(memberships.member_exists(user_id, group_id)))
+    if add and not is_member:
+        db.execute(insert(group_member).values(user_id=user_id, group_id=group_id))
+    elif not add and is_member:
+        db.execute(
+            delete(group_member)
+            .where(group_member.c.user_id == user_id, group_member.c.group_id == group_id)
+        )
+    if add != is_member:
+        memberships.changed(db, user_id)
+        filter_access.refresh_users(db, [user_id])
     
     db.commit()
     db.refresh(db_group)
     return db_group
 
+MEMBERSHIP_MODES = ("add", "remove", "replace")
+
+def update_group_members(
+    db: Session,
+    group_id: int,
+    user_ids: List[int],
+    mode: str = "add"
+) -> schemas.GroupMembersResult:
+    """
+    Add the given users to a group, remove them, or make them its exact
+    membership. The difference with the current members is computed in SQL
+    and applied with one insert and one delete, in a single transaction.
+    """
+    if mode not in MEMBERSHIP_MODES:
+        raise HTTPException(400, f"Unknown mode {mode!r}")
+    user_ids = sorted(set(user_ids))
+    if len(user_ids) > settings.GROUP_MEMBERS_BATCH_LIMIT:
+        raise HTTPException(
+            400, f"At most {settings.GROUP_MEMBERS_BATCH_LIMIT} user ids per request"
+        )
+    if not db.get(Group, group_id):
+        raise HTTPException(404, "Group not found")
+    if mode != "remove":
+        missing = set(user_ids) - set(db.scalars(select(User.id).where(User.id.in_(user_ids))))
+        if missing:
+            raise HTTPException(404, f"Users not found: {sorted(missing)}")
+
+    in_group = group_member.c.group_id == group_id
+    added, removed = [], []
+    if mode != "remove":
+        added = db.scalars(
+            insert(group_member)
+            .from_select(
+                ["user_id", "group_id"],
+                select(User.id, literal(group_id))
+                .where(User.id.in_(user_ids), ~memberships.member_exists(User.id, group_id))
+            )
+            .returning(group_member.c.user_id)
+        ).all()
+    if mode == "remove":
+        removed = db.scalars(
+            delete(group_member)
+            .where(in_group, group_member.c.user_id.in_(user_ids))
+            .returning(group_member.c.user_id)
+        ).all()
+    elif mode == "replace":
+        removed = db.scalars(
+            delete(group_member)
+            .where(in_group, group_member.c.user_id.not_in(user_ids))
+            .returning(group_member.c.user_id)
+        ).all()
+
+    changed = set(added) | set(removed)
+    if changed:
+        memberships.changed(db, *changed)
+        filter_access.refresh_users(db, changed)
+    member_count = db.scalar(select(func.count()).select_from(group_member).where(in_group))
+    db.commit()
+    return schemas.GroupMembersResult(
+        group_id=group_id,
+        added=len(added),
+        removed=len(removed),
+        member_count=member_count
+    )
+
 # SavedFilter operations
 def get_filter(db: Session, filter_id: int) -> Optional[SavedFilter]:
-    return db.query(SavedFilter).filter(SavedFilter.id == filter_id).first()
+    return db.get(SavedFilter, filter_id)
 
 def get_filters(
     db: Session,
@@ -328,41 +703,59 @@ def get_filters(
     user_id: Optional[int] = None,
     group_id: Optional[int] = None
 ) -> schemas.FilterList:
-    query = db.query(SavedFilter)
+    query = select(SavedFilter)
+    count = select(func.count()).select_from(SavedFilter)
     if user_id:
-        query = query.filter(
-            or_(
-                SavedFilter.user_id == user_id,
-                SavedFilter.group_id.in_(
-                    db.query(Group.id)
-                    .filter(Group.members.any(id=user_id))
-                )
-            )
+        # The user's precomputed access rows, in primary key order
+        query = (
+            query.join(FilterAccess, FilterAccess.filter_id == SavedFilter.id)
+            .where(FilterAccess.user_id == user_id)
+            .order_by(FilterAccess.filter_id)
+        )
+        count = (
+            select(func.count()).select_from(FilterAccess)
+            .where(FilterAccess.user_id == user_id)
         )
+        if group_id:
+            count = count.join(SavedFilter, SavedFilter.id == FilterAccess.filter_id)
+    else:
+        query = query.order_by(SavedFilter.id)
     if group_id:
-        query = query.filter(SavedFilter.group_id == group_id)
+        query = query.where(SavedFilter.group_id == group_id)
+        count = count.where(SavedFilter.group_id == group_id)
     
-    total = query.count()
-    items = query.offset(skip).limit(limit).all()
+    total = db.scalar(count)
+    items = db.scalars(
+        query.options(selectinload(SavedFilter.user), selectinload(SavedFilter.group))
+        .offset(skip).limit(limit)
+    ).all()
     return schemas.FilterList(
         items=items,
         total=total,
         page=skip // limit + 1,
-        page_size=limit
+        size=limit,
+        pages=(total + limit - 1) // limit
     )
 
+def _check_filter_criteria(criteria) -> None:
+    try:
+        filter_dsl.compile_criteria(criteria)
+    except filter_dsl.FilterError as e:
+        raise HTTPException(400, f"Invalid filter: {e}")
+
 def create_filter(
     db: Session,
     filter_create: schemas.FilterCreate,
     user_id: int
 ) -> SavedFilter:
     if filter_create.group_id:
-        group = get_group(db, filter_create.group_id)
-        if not group or not any(m.id == user_id for m in group.members):
+        if not is_user_in_group(db, user_id, filter_create.group_id):
             raise HTTPException(400, "User not in specified group")
     
+    _check_filter_criteria(filter_create.filter_criteria)
+    
     db_filter = SavedFilter(
-        **filter_create.dict(),
+        **filter_create.dict(exclude={'filter_criteria', 'visible_columns'}),
         user_id=user_id,
         filter_criteria=json.dumps(filter_create.filter_criteria),
         visible_columns=json.dumps(filter_create.visible_columns)
@@ -387,11 +780,11 @@ def update_filter(
     
     update_data = filter_update.dict(exclude_unset=True)
     if 'group_id' in update_data:
-        group = get_group(db, update_data['group_id'])
-        if not group or not any(m.id == user_id for m in group.members):
+        if not is_user_in_group(db, user_id, update_data['group_id']):
             raise HTTPException(400, "User not in specified group")
     
     if 'filter_criteria' in update_data:
+        _check_filter_criteria(update_data['filter_criteria'])
         update_data['filter_criteria'] = json.dumps(update_data['filter_criteria'])
     if 'visible_columns' in update_data:
         update_data['visible_columns'] = json.dumps(update_data['visible_columns'])
@@ -404,70 +797,227 @@ def update_filter(
     db.refresh(db_filter)
     return db_filter
 
-def get_recipe(db: Session, recipe_id: int) -> Optional[Recipe]:
-    return db.query(Recipe).filter(Recipe.id == recipe_id).first()
+def delete_filter(db: Session, filter_id: int) -> bool:
+    db_filter = get_filter(db, filter_id)
+    if not db_filter:
+        return False
+    db.delete(db_filter)
+    db.commit()
+    return True
 
-def get_recipes(
+# Sortable dataset columns
+DATASET_SORT_FIELDS = {
+    "id": Service.id,
+    "ip": Service.ip_key,
+    "port": Service.port,
+    "domain": Service.domain,
+    "timestamp": Service.timestamp,
+}
+
+def get_fruit_dataset(
     db: Session,
     skip: int = 0,
     limit: int = 100,
-    search: Optional[str] = None,
-    fruit_type_id: Optional[int] = None,
-    max_time: Optional[int] = None
-) -> schemas.RecipeList:
+    filter_criteria: Optional[dict] = None,
+    saved_filter: Optional[SavedFilter] = None,
+    sort_by: Optional[str] = None,
+    sort_desc: bool = False
+) -> schemas.ServiceSummaryList:
     """
-    Get recipes with optional filtering and search.
+    Get a page of services matching a saved filter or an ad hoc filter
+    expression (see app/filter_dsl.py). Saved filters are compiled once
+    per revision, and read from their stored results when materialized.
     """
-    query = db.query(Recipe)
-    
-    if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Recipe.name.ilike(search_filter),
-                Recipe.description.ilike(search_filter)
+    if sort_by and sort_by not in DATASET_SORT_FIELDS:
+        raise HTTPException(400, f"Cannot sort by {sort_by!r}")
+    sort_column = DATASET_SORT_FIELDS[sort_by or "id"]
+    criteria = []
+    total = None
+    try:
+        if saved_filter is not None:
+            # Current stored results replace the filter's own query
+            materialization = (
+                None if filter_criteria else filter_results.open_filter(db, saved_filter)
             )
-        )
+            if materialization is not None:
+                criteria.append(filter_results.matches(saved_filter.id))
+                total = materialization.row_count
+            else:
+                criteria.append(filter_dsl.for_filter(saved_filter))
+        if filter_criteria:
+            criteria.append(filter_dsl.compile_criteria(filter_criteria))
+    except filter_dsl.FilterError as e:
+        raise HTTPException(400, f"Invalid filter: {e}")
+    order_by = (sort_column.desc() if sort_desc else sort_column, Service.id)
+    return _service_page(db, criteria, skip, limit, order_by, total)
+
+def get_recipe(db: Session, recipe_id: int) -> Optional[Recipe]:
+    return db.get(Recipe, recipe_id)
+
+def _recipe_page(
+    db: Session,
+    skip: int,
+    limit: int,
+    search: Optional[str],
+    fruit_type_id: Optional[int],
+    max_time: Optional[int]
+) -> tuple:
+    """RecipeSummary dicts for one page, with the total row count."""
+    criteria = _recipe_filters(fruit_type_id, max_time)
+    hits = _recipe_hits(search)
+    if hits is None and search and search.strip():
+        # Text with no searchable words (only punctuation or quotes) matches nothing
+        return [], 0
     
-    if fruit_type_id:
-        query = query.filter(Recipe.fruit_types.any(FruitType.id == fruit_type_id))
+    total = db.scalar(_search_recipes(select(func.count()).select_from(Recipe), hits).where(*criteria))
+    snippet = hits.c.snippet if hits is not None else null()
+    rows = db.execute(
+        _search_recipes(
+            select(*_recipe_summary_encoder.columns, _preview(Recipe.description), snippet), hits
+        )
+        .where(*criteria)
+        .order_by(*_recipe_order(hits))
+        .offset(skip)
+        .limit(limit)
+    ).all()
     
-    if max_time:
-        query = query.filter(Recipe.preparation_time <= max_time)
+    split = len(_recipe_summary_encoder.columns)
+    items = []
+    by_id = {}
+    for row in rows:
+        item = _recipe_summary_encoder.encode_row(row[:split])
+        item['description_preview'] = row[split]
+        item['snippet'] = recipe_search.highlight(row[split + 1])
+        item['fruit_types'] = []
+        items.append(item)
+        by_id[item['id']] = item
     
-    total = query.count()
-    recipes = query.order_by(Recipe.name).offset(skip).limit(limit).all()
-    pages = (total + limit - 1) // limit
+    if by_id:
+        type_rows = db.execute(
+            select(fruit_type_recipe.c.recipe_id, *_fruit_type_ref_encoder.columns)
+            .join(FruitType, FruitType.id == fruit_type_recipe.c.fruit_type_id)
+            .where(fruit_type_recipe.c.recipe_id.in_(list(by_id)))
+        ).all()
+        for row in type_rows:
+            by_id[row[0]]['fruit_types'].append(_fruit_type_ref_encoder.encode_row(row[1:]))
+    return items, total
 
-    return schemas.RecipeList(
-        items=[schemas.RecipeResponse.model_validate(r) for r in recipes],
+def get_recipes(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    fruit_type_id: Optional[int] = None,
+    max_time: Optional[int] = None
+) -> schemas.RecipeSummaryList:
+    """
+    Get a page of recipe summaries with optional filtering and search.
+    """
+    items, total = _recipe_page(db, skip, limit, search, fruit_type_id, max_time)
+    return schemas.RecipeSummaryList(
+        items=items,
         total=total,
         page=skip // limit + 1,
         size=limit,
-        pages=pages
+        pages=(total + limit - 1) // limit
     )
 
+def _recipe_filters(
+    fruit_type_id: Optional[int] = None,
+    max_time: Optional[int] = None
+) -> list:
+    criteria = []
+    if fruit_type_id:
+        criteria.append(Recipe.fruit_types.any(FruitType.id == fruit_type_id))
+    
+    if max_time:
+        criteria.append(Recipe.preparation_time <= max_time)
+    return criteria
+
+def _recipe_hits(search: Optional[str]):
+    """Full-text hits for the search box text; None when there is nothing to search."""
+    expression = recipe_search.match_expression(search) if search else None
+    return recipe_search.hits(expression) if expression else None
+
+def _search_recipes(statement, hits):
+    """Restrict a recipe statement to the search hits, if any."""
+    if hits is None:
+        return statement
+    return statement.join(hits, hits.c.recipe_id == Recipe.id)
+
+def _recipe_order(hits) -> tuple:
+    """Best ranked hits first when searching, then by name."""
+    return (Recipe.name,) if hits is None else (hits.c.rank, Recipe.name)
+
+def get_recipes_json(
+    db: Session,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    fruit_type_id: Optional[int] = None,
+    max_time: Optional[int] = None
+) -> bytes:
+    """Same page as get_recipes, encoded straight from SQL rows to JSON."""
+    items, total = _recipe_page(db, skip, limit, search, fruit_type_id, max_time)
+    return dump_page(items, total, skip, limit)
+
 def get_recipe_count(db: Session) -> int:
-    print("Querying recipe count...")  # Debug output
-    count = db.query(Recipe).count()
-    print(f"Found {count} recipes")  # Debug output
+    count = _total(db, Recipe, [])
+    logger.debug("Found %d recipes", count)
     return count
 
 def get_fruit_type_count(db: Session) -> int:
-    print("Querying fruit type count...")  # Debug output
-    count = db.query(FruitType).count()
-    print(f"Found {count} fruit types")  # Debug output
+    count = _total(db, FruitType, [])
+    logger.debug("Found %d fruit types", count)
     return count
 
 def get_filter_count(db: Session, username: str) -> int:
-    print(f"Querying filter count for user {username}...")  # Debug output
     user = get_user_by_username(db, username)
     if not user:
         return 0
-    count = db.query(SavedFilter).filter_by(user_id=user.id).count()
-    print(f"Found {count} filters")  # Debug output
+    count = _total(db, SavedFilter, [SavedFilter.user_id == user.id])
+    logger.debug("Found %d filters for user %s", count, username)
     return count
 
+def match_recipes(
+    db: Session,
+    fruit_type_ids: List[int],
+    mode: str = "all",
+    skip: int = 0,
+    limit: int = 100
+) -> schemas.RecipeMatchList:
+    """
+    Recipes matching a fruit inventory, best coverage first. `mode` is one
+    of recipe_matching.MODES.
+    """
+    if mode not in recipe_matching.MODES:
+        raise HTTPException(400, f"mode must be one of: {', '.join(recipe_matching.MODES)}")
+    if not fruit_type_ids:
+        raise HTTPException(400, "At least one fruit type is required")
+    matches = recipe_matching.match(db, fruit_type_ids, mode)
+    page = matches[skip:skip + limit]
+    
+    rows = db.execute(
+        select(Recipe, _preview(Recipe.description))
+        .options(*_RECIPE_LIST_OPTIONS)
+        .where(Recipe.id.in_([m.recipe_id for m in page]))
+    ).all()
+    summaries = {}
+    for recipe, description_preview in rows:
+        summaries[recipe.id] = schemas.RecipeSummary.model_validate(recipe)
+        summaries[recipe.id].description_preview = description_preview
+    
+    return schemas.RecipeMatchList(
+        items=[
+            schemas.RecipeMatch(recipe=summaries[m.recipe_id], matched=m.matched, required=m.required)
+            for m in page if m.recipe_id in summaries
+        ],
+        total=len(matches),
+        page=skip // limit + 1,
+        size=limit,
+        pages=(len(matches) + limit - 1) // limit
+    )
+
 def get_recipes_by_fruit_type(
     db: Session,
     fruit_type_id: int,
@@ -484,37 +1034,43 @@ def get_recipes_by_fruit_type(
         raise HTTPException(404, "Fruit type not found")
     
     # Query recipes that include this fruit type
-    query = db.query(Recipe).filter(
-        Recipe.fruit_types.any(FruitType.id == fruit_type_id)
-    )
-    
-    recipes = query.offset(skip).limit(limit).all()
-    return recipes
+    return db.scalars(
+        select(Recipe)
+        .where(Recipe.fruit_types.any(FruitType.id == fruit_type_id))
+        .offset(skip)
+        .limit(limit)
+    ).all()
 
 def get_owner(db: Session, owner_id: int) -> Optional[Owner]:
-    return db.query(Owner).filter(Owner.id == owner_id).first()
+    return db.get(Owner, owner_id)
 
 def get_owners(
     db: Session,
     skip: int = 0,
     limit: int = 100,
-    search: Optional[str] = None
-) -> List[Owner]:
-    query = db.query(Owner)
-    
+    search: Optional[str] = None,
+    sort: Optional[str] = None
+) -> schemas.OwnerList:
+    criteria = []
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Owner.name.ilike(search_filter),
-                Owner.description.ilike(search_filter)
-            )
-        )
+        criteria.append(trigram.contains(Owner, search, Owner.name, Owner.description))
     
-    total = query.count()
-    owners = query.offset(skip).limit(limit).all()
+    total = _total(db, Owner, criteria)
+    owners = db.scalars(
+        select(Owner)
+        .where(*criteria)
+        .order_by(*_order_by(_OWNER_ORDER, sort))
+        .offset(skip)
+        .limit(limit)
+    ).all()
     
-    return owners
+    return schemas.OwnerList(
+        items=[schemas.OwnerResponse.model_validate(o) for o in owners],
+        total=total,
+        page=skip // limit + 1,
+        size=limit,
+        pages=(total + limit - 1) // limit
+    )
 
 def create_owner(db: Session, owner: schemas.OwnerCreate) -> Owner:
     db_owner = Owner(**owner.dict())
@@ -536,18 +1092,12 @@ def update_owner(db: Session, owner_id: int, owner: schemas.OwnerUpdate) -> Opti
     db.refresh(db_owner)
     return db_owner
 
-def delete_owner(db: Session, owner_id: int) -> bool:
-    owner = get_owner(db, owner_id)
-    if owner is None:
-        return False
-    
-    db.delete(owner)
-    db.commit()
-    return True
+def delete_owner(db: Session, owner_id: int, dry_run: bool = False) -> Optional[dict]:
+    return _cascade_delete(db, Owner, owner_id, dry_run=dry_run)
 
 # Service operations
 def get_service(db: Session, service_id: int) -> Optional[Service]:
-    return db.query(Service).filter(Service.id == service_id).first()
+    return db.get(Service, service_id)
 
 def get_services(
     db: Session,
@@ -561,44 +1111,95 @@ def get_services(
     asn: Optional[str] = None,
     domain: Optional[str] = None,
     search: Optional[str] = None
-) -> ServiceList:
-    query = db.query(Service)
-    
+) -> schemas.ServiceSummaryList:
+    criteria = []
     if owner_id:
-        query = query.filter(Service.owner_id == owner_id)
+        criteria.append(Service.owner_id == owner_id)
     if fruit_id:
-        query = query.filter(Service.fruit_id == fruit_id)
+        criteria.append(Service.fruit_id == fruit_id)
+    # Substring filters are answered from the services trigram index
     if ip:
-        query = query.filter(Service.ip.ilike(f"%{ip}%"))
+        criteria.append(trigram.contains(Service, ip, Service.ip))
     if port:
-        query = query.filter(Service.port == port)
+        criteria.append(Service.port == port)
     if country:
-        query = query.filter(Service.country.ilike(f"%{country}%"))
+        criteria.append(trigram.contains(Service, country, Service.country))
     if asn:
-        query = query.filter(Service.asn.ilike(f"%{asn}%"))
+        criteria.append(trigram.contains(Service, asn, Service.asn))
     if domain:
-        query = query.filter(Service.domain.ilike(f"%{domain}%"))
+        criteria.append(trigram.contains(Service, domain, Service.domain))
     if search:
-        search_filter = f"%{search}%"
-        query = query.filter(
-            or_(
-                Service.banner_data.ilike(search_filter),
-                Service.domain.ilike(search_filter),
-                Service.country.ilike(search_filter),
-                Service.asn.ilike(search_filter)
+        criteria.append(
+            trigram.contains(
+                Service, search,
+                Service.banner_data, Service.domain, Service.country, Service.asn
             )
         )
     
-    total = query.count()
-    services = query.offset(skip).limit(limit).all()
+    return _service_page(db, criteria, skip, limit)
+
+def _service_page(
+    db: Session,
+    criteria: list,
+    skip: int,
+    limit: int,
+    order_by: tuple = (),
+    total: Optional[int] = None
+) -> schemas.ServiceSummaryList:
+    if total is None:
+        total = _total(db, Service, criteria)
+    items = _service_summaries(db, criteria, order_by, skip, limit)
     
-    return ServiceList(
-        items=services,
+    return schemas.ServiceSummaryList(
+        items=items,
         total=total,
         page=(skip // limit) + 1,
         size=limit
     )
 
+# Built once: only the criteria, order and page vary per call
+_SERVICE_SUMMARY_SELECT = _join_lookups(
+    select(
+        *_service_summary_encoder.columns, _preview(Service.banner_data),
+        *_fruit_ref_encoder.columns, *_owner_ref_encoder.columns
+    )
+    .outerjoin(Fruit, Service.fruit_id == Fruit.id)
+    .outerjoin(Owner, Service.owner_id == Owner.id),
+    _SERVICE_LOOKUPS
+)
+
+def _service_summaries(
+    db: Session,
+    criteria: list,
+    order_by: tuple = (),
+    skip: int = 0,
+    limit: Optional[int] = None
+) -> List[dict]:
+    """
+    ServiceSummary dicts for the matching services. Read as rows rather than
+    Service entities: no identity map is needed, and the lookup names come
+    from joins.
+    """
+    fruit_split = len(_service_summary_encoder.columns) + 1
+    owner_split = fruit_split + len(_fruit_ref_encoder.columns)
+    rows = db.execute(
+        _SERVICE_SUMMARY_SELECT
+        .where(*criteria)
+        .order_by(*order_by)
+        .offset(skip)
+        .limit(limit)
+    ).all()
+    
+    items = []
+    for row in rows:
+        item = _service_summary_encoder.encode_row(row[:fruit_split - 1])
+        item['banner_preview'] = row[fruit_split - 1]
+        fruit, owner = row[fruit_split:owner_split], row[owner_split:]
+        item['fruit'] = _fruit_ref_encoder.encode_row(fruit) if fruit[0] is not None else None
+        item['owner'] = _owner_ref_encoder.encode_row(owner) if owner[0] is not None else None
+        items.append(item)
+    return items
+
 def create_service(db: Session, service: schemas.ServiceCreate) -> Service:
     # Convert http_data to JSON string if it's provided
     service_data = service.dict()
@@ -643,11 +1244,12 @@ def get_services_by_owner(
     skip: int = 0,
     limit: int = 100
 ) -> List[Service]:
-    return (db.query(Service)
-            .filter(Service.owner_id == owner_id)
-            .offset(skip)
-            .limit(limit)
-            .all())
+    return db.scalars(lambda_stmt(
+        lambda: select(Service)
+        .where(Service.owner_id == owner_id)
+        .offset(skip)
+        .limit(limit)
+    )).all()
 
 def get_services_by_fruit(
     db: Session,
@@ -655,19 +1257,72 @@ def get_services_by_fruit(
     skip: int = 0,
     limit: int = 100
 ) -> List[Service]:
-    return (db.query(Service)
-            .filter(Service.fruit_id == fruit_id)
-            .offset(skip)
-            .limit(limit)
-            .all())
-
-
-def get_unique_asns(db: Session) -> List[str]:
-    """Get list of unique ASNs from services table."""
-    asns = db.query(Service.asn).distinct().order_by(Service.asn).all()
-    return [asn[0] for asn in asns if asn[0]]
-
-def get_unique_countries(db: Session) -> List[str]:
-    """Get list of unique countries from services table."""
-    countries = db.query(Service.country).distinct().order_by(Service.country).all()
-    return [country[0] for country in countries if country[0]]
\ No newline at end of file
+    return db.scalars(lambda_stmt(
+        lambda: select(Service)
+        .where(Service.fruit_id == fruit_id)
+        .offset(skip)
+        .limit(limit)
+    )).all()
+
+
+# Typeahead operations
+# SQLite's lower() only folds ASCII, so prefixes are folded the same way to
+# range-scan the lower(column) expression indexes.
+_ASCII_LOWER = str.maketrans("ABCDEFGHIJKLMNOPQRSTUVWXYZ", "abcdefghijklmnopqrstuvwxyz")
+
+def _prefix_range(column, prefix: Optional[str]) -> list:
+    """Criteria matching lower(column) values that start with `prefix`."""
+    key = func.lower(column)
+    if not prefix:
+        return [column.isnot(None), column != ""]
+    prefix = prefix.translate(_ASCII_LOWER)
+    return [key >= prefix, key < prefix + "\U0010ffff"]
+
+def _suggest_entities(db: Session, model, prefix: Optional[str], limit: int) -> List[dict]:
+    rows = db.execute(
+        select(model.id, model.name)
+        .where(*_prefix_range(model.name, prefix))
+        .order_by(func.lower(model.name))
+        .limit(limit)
+    )
+    return [{"id": row.id, "name": row.name} for row in rows]
+
+def suggest_owners(db: Session, prefix: Optional[str] = None, limit: int = 10) -> List[dict]:
+    """Owners whose name starts with `prefix` (case-insensitive)."""
+    return _suggest_entities(db, Owner, prefix, limit)
+
+def suggest_fruits(db: Session, prefix: Optional[str] = None, limit: int = 10) -> List[dict]:
+    """Fruits whose name starts with `prefix` (case-insensitive)."""
+    return _suggest_entities(db, Fruit, prefix, limit)
+
+# field -> (value column, service column referencing it when the values
+# live in a lookup table)
+SERVICE_SUGGEST_FIELDS = {
+    "asns": (Asn.name, Service.asn_id),
+    "countries": (Country.name, Service.country_id),
+    "domains": (Service.domain, None)
+}
+
+def suggest_service_values(
+    db: Session,
+    field: str,
+    prefix: Optional[str] = None,
+    limit: int = 10
+) -> List[str]:
+    """Distinct service ASNs, countries or domains starting with `prefix`."""
+    column, reference = SERVICE_SUGGEST_FIELDS[field]
+    key = func.lower(column)
+    criteria = _prefix_range(column, prefix)
+    if reference is not None:
+        # Only values some service still uses
+        criteria.append(exists().where(reference == column.class_.id))
+    # Grouping on the indexed expression walks the index in order and stops
+    # after `limit` groups instead of collecting every distinct value
+    rows = db.execute(
+        select(func.min(column))
+        .where(*criteria)
+        .group_by(key)
+        .order_by(key)
+        .limit(limit)
+    )
+    return [row[0] for row in rows]
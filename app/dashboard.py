@@ -0,0 +1,38 @@
+# File: app/dashboard.py
+from typing import Dict
+
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.config import settings
+from app.models import Recipe, FruitType, Fruit, Service, Owner, SavedFilter
+from app.utils.cache import TTLCache
+
+# Home page counters per user id; cleared whenever a counted table changes
+_stats_cache = TTLCache(ttl=settings.DASHBOARD_CACHE_TTL, maxsize=1024)
+
+@data_versions.on_change(
+    "recipes", "fruit_types", "fruits", "services", "owners", "saved_filters"
+)
+def _invalidate_stats(tables):
+    _stats_cache.clear()
+
+def _count(model, *criteria):
+    return select(func.count()).select_from(model).where(*criteria).scalar_subquery()
+
+def get_dashboard_stats(db: Session, user_id: int) -> Dict[str, int]:
+    """Get the home page counters, computed in a single round trip."""
+    stats = _stats_cache.get(user_id)
+    if stats is None:
+        row = db.execute(select(
+            _count(Recipe).label("total_recipes"),
+            _count(FruitType).label("total_types"),
+            _count(SavedFilter, SavedFilter.user_id == user_id).label("total_filters"),
+            _count(Service).label("total_services"),
+            _count(Owner).label("total_owners"),
+            _count(Fruit).label("total_fruits")
+        )).one()
+        stats = dict(row._mapping)
+        _stats_cache.set(user_id, stats)
+    return stats
@@ -0,0 +1,109 @@
+# File: app/data_versions.py
+# Per-table change tracking for write-driven cache invalidation.
+#
+# Every ORM flush and bulk statement records the tables it wrote on the
+# session. Just before commit the tables' rows in `data_versions` are bumped
+# in the same transaction, so every process sees consistent versions; after
+# commit the in-process callbacks registered with `on_change` are run.
+from collections import defaultdict
+from datetime import datetime
+from itertools import chain
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from sqlalchemy import event, inspect, select, update, insert
+from sqlalchemy.orm import Session
+
+from app.models import DataVersion
+
+_listeners: Dict[str, List[Callable[[Set[str]], None]]] = defaultdict(list)
+
+def on_change(*tables: str):
+    """Decorator registering `callback(changed_tables)` for commits touching `tables`."""
+    def register(callback):
+        for table in tables:
+            _listeners[table].append(callback)
+        return callback
+    return register
+
+def mark_changed(session: Session, *tables: str) -> None:
+    """Record tables written outside the ORM unit of work (e.g. Core statements)."""
+    session.info.setdefault("changed_tables", set()).update(tables)
+
+def get_versions(db: Session, *tables: str) -> Tuple[tuple, Optional[datetime]]:
+    """
+    Get the committed versions of `tables`, in the order given, and the most
+    recent modification time among them (None if never written).
+    """
+    rows = dict(
+        (row.table_name, row)
+        for row in db.execute(
+            select(DataVersion.table_name, DataVersion.version, DataVersion.modified_at)
+            .where(DataVersion.table_name.in_(tables))
+        )
+    )
+    versions = tuple(rows[table].version if table in rows else 0 for table in tables)
+    modified = [row.modified_at for row in rows.values()]
+    return versions, max(modified) if modified else None
+
+def bump(db: Session, tables: Iterable[str]) -> None:
+    """Increment the stored versions of `tables` inside the current transaction."""
+    now = datetime.utcnow()
+    for table in sorted(tables):
+        result = db.connection().execute(
+            update(DataVersion)
+            .where(DataVersion.table_name == table)
+            .values(version=DataVersion.version + 1, modified_at=now)
+        )
+        if result.rowcount == 0:
+            db.connection().execute(
+                insert(DataVersion).values(table_name=table, version=1, modified_at=now)
+            )
+
+def notify(tables: Iterable[str]) -> None:
+    """Run in-process listeners for committed changes to `tables`."""
+    tables = set(tables)
+    callbacks = []
+    for table in tables:
+        for callback in _listeners.get(table, ()):
+            if callback not in callbacks:
+                callbacks.append(callback)
+    for callback in callbacks:
+        callback(tables)
+
+@event.listens_for(Session, "after_flush")
+def _collect_flushed_tables(session, flush_context):
+    tables = set()
+    for obj in chain(session.new, session.dirty, session.deleted):
+        state = inspect(obj)
+        tables.update(table.name for table in state.mapper.tables)
+        # Many-to-many collection changes write to the association table
+        for rel in state.mapper.relationships:
+            if rel.secondary is None:
+                continue
+            if obj not in session.dirty or state.attrs[rel.key].history.has_changes():
+                tables.add(rel.secondary.name)
+    if tables:
+        mark_changed(session, *tables)
+
+@event.listens_for(Session, "do_orm_execute")
+def _collect_bulk_tables(orm_execute_state):
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_changed(orm_execute_state.session, orm_execute_state.statement.table.name)
+
+@event.listens_for(Session, "before_commit")
+def _bump_committed_tables(session):
+    # Flush first so the tables written by the final autoflush are included
+    session.flush()
+    tables = session.info.get("changed_tables")
+    if tables:
+        bump(session, tables - {DataVersion.__tablename__})
+
+@event.listens_for(Session, "after_commit")
+def _notify_committed(session):
+    tables = session.info.pop("changed_tables", None)
+    if tables:
+        notify(tables)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("changed_tables", None)
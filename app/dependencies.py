@@ -4,7 +4,7 @@ from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 from jose import JWTError, jwt
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Tuple
 
 from app.database import get_db
 import app.crud as crud
@@ -22,6 +22,43 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def get_token(request: Request) -> Optional[str]:
+    """Get the raw access token from the request cookie."""
+    token = request.cookies.get("access_token")
+    if token and token.startswith("Bearer "):
+        token = token[7:]
+    return token or None
+
+def decode_token(request: Request) -> Optional[Tuple[str, str]]:
+    """
+    Verify the access token once per request.
+    Returns (username, token signature), or None for a missing or invalid token.
+    """
+    if hasattr(request.state, "token_claims"):
+        return request.state.token_claims
+
+    claims = None
+    token = get_token(request)
+    if token:
+        try:
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+            username: str = payload.get("sub")
+            if username is not None:
+                claims = (username, token.rsplit(".", 1)[-1])
+        except JWTError:
+            pass
+
+    request.state.token_claims = claims
+    return claims
+
+def resolve_user(request: Request, db: Session):
+    """Get the user for the request's access token, or None."""
+    claims = decode_token(request)
+    if claims is None:
+        return None
+    username, signature = claims
+    return crud.get_principal(db, username, signature)
+
 async def get_current_user(request: Request, db: Session = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -29,24 +66,7 @@ async def get_current_user(request: Request, db: Session = Depends(get_db)):
         headers={"WWW-Authenticate": "Bearer"},
     )
 
-    # Get token from cookie
-    token = request.cookies.get("access_token")
-    if not token:
-        raise credentials_exception
-
-    try:
-        # Remove "Bearer " prefix if present
-        if token.startswith("Bearer "):
-            token = token[7:]
-
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
-
-    user = crud.get_user_by_username(db, username)
+    user = resolve_user(request, db)
     if user is None:
         raise credentials_exception
 
@@ -0,0 +1,95 @@
+# File: app/filter_access.py
+# Precomputed saved-filter visibility.
+#
+# `filter_access` holds one (user_id, filter_id) row for every filter a user
+# can see: the filters they own and those shared with a group they belong
+# to. Listing a user's filters is then a range scan of the primary key
+# instead of an OR over ownership and a membership subquery.
+#
+# Rows are recomputed per filter when filters are created, deleted or
+# change owner or group, and per user when their membership changes. ORM
+# writes are picked up by a flush hook; Core writes to group_member must
+# call `refresh_users`.
+from typing import Iterable
+
+from sqlalchemy import delete, event, inspect, insert, select, union
+from sqlalchemy.orm import Session
+
+from app.models import FilterAccess, Group, SavedFilter, User, group_member
+
+TABLE_NAME = FilterAccess.__tablename__
+
+CHUNK_SIZE = 500
+
+# SavedFilter attributes that decide who can see it
+_FILTER_ATTRIBUTES = ("user_id", "group_id", "user", "group")
+
+def _visible(filter_criterion=None, owner_criterion=None, member_criterion=None):
+    # (user_id, filter_id) for owners, and for members of the filter's group
+    owners = select(SavedFilter.user_id, SavedFilter.id)
+    members = select(group_member.c.user_id, SavedFilter.id).join(
+        group_member, group_member.c.group_id == SavedFilter.group_id
+    )
+    if filter_criterion is not None:
+        owners = owners.where(filter_criterion)
+        members = members.where(filter_criterion)
+    if owner_criterion is not None:
+        owners = owners.where(owner_criterion)
+        members = members.where(member_criterion)
+    return union(owners, members)
+
+def _fill(connection, rows) -> None:
+    connection.execute(insert(FilterAccess).from_select(["user_id", "filter_id"], rows))
+
+def refresh_filters(db: Session, ids: Iterable[int]) -> None:
+    """Recompute who can see the given filters; missing filters are dropped."""
+    connection = db.connection()
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        connection.execute(delete(FilterAccess).where(FilterAccess.filter_id.in_(chunk)))
+        _fill(connection, _visible(filter_criterion=SavedFilter.id.in_(chunk)))
+
+def refresh_users(db: Session, ids: Iterable[int]) -> None:
+    """Recompute the filters the given users can see."""
+    connection = db.connection()
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        connection.execute(delete(FilterAccess).where(FilterAccess.user_id.in_(chunk)))
+        _fill(connection, _visible(
+            owner_criterion=SavedFilter.user_id.in_(chunk),
+            member_criterion=group_member.c.user_id.in_(chunk)
+        ))
+
+def rebuild(db: Session) -> None:
+    """Recompute every row. The caller commits."""
+    connection = db.connection()
+    connection.execute(delete(FilterAccess))
+    _fill(connection, _visible())
+
+def _collection_changes(state, key) -> list:
+    history = state.attrs[key].history
+    return list(history.added or ()) + list(history.deleted or ())
+
+@event.listens_for(Session, "after_flush")
+def _refresh_flushed(session, flush_context):
+    filters = {obj.id for obj in session.new if isinstance(obj, SavedFilter)}
+    filters.update(obj.id for obj in session.deleted if isinstance(obj, SavedFilter))
+    users = set()
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, (SavedFilter, Group, User)):
+            continue
+        state = inspect(obj)
+        if isinstance(obj, SavedFilter):
+            if any(state.attrs[c].history.has_changes() for c in _FILTER_ATTRIBUTES):
+                filters.add(obj.id)
+        elif isinstance(obj, Group):
+            users.update(user.id for user in _collection_changes(state, "members"))
+        else:
+            if _collection_changes(state, "groups"):
+                users.add(obj.id)
+    if filters:
+        refresh_filters(session, filters)
+    if users:
+        refresh_users(session, users)
@@ -0,0 +1,222 @@
+# File: app/filter_dsl.py
+# Saved-filter expressions over the service dataset.
+#
+# A filter is a JSON tree. Leaves compare one field:
+#
+#   {"field": "port", "operator": "in", "value": [80, 443]}
+#   {"field": "ip", "operator": "cidr", "value": "10.0.0.0/8"}
+#   {"field": "fruit.date_picked", "operator": "between", "value": ["2024-01-01", "2024-06-30"]}
+#   {"field": "owner.name", "operator": "contains", "value": "acme"}
+#
+# and {"and": [...]}, {"or": [...]} and {"not": {...}} combine them. The
+# list form {"criteria": [leaf, ...]} is read as an "and", and an empty
+# filter matches every service.
+#
+# `compile_criteria` validates a tree and turns it into a SQLAlchemy
+# criterion on Service. Values become bound parameters, so equally shaped
+# filters share one compiled statement. Fruit and owner fields compile to
+# `Service.fruit_id IN (SELECT ...)` subqueries, lookup-backed names to id
+# comparisons, and IP ranges to ranges over the indexed ip_key column.
+# Saved filters are compiled once per (id, modified_at) by `for_filter`.
+import ipaddress
+import json
+from datetime import datetime
+from typing import Any, NamedTuple, Optional
+
+from sqlalchemy import and_, not_, or_, select, true
+
+from app import trigram
+from app.config import settings
+from app.models import Asn, Country, Fruit, Owner, SavedFilter, Service, ip_key
+from app.utils.cache import TTLCache
+
+class FilterError(ValueError):
+    """The filter expression is malformed or uses an unknown field or operator."""
+
+class Field(NamedTuple):
+    model: type
+    column: object
+    kind: str  # int, datetime, str, ip or lookup
+    lookup: Optional[type] = None  # for lookup fields, the table `column` references
+
+FIELDS = {
+    "ip": Field(Service, Service.ip, "ip"),
+    "port": Field(Service, Service.port, "int"),
+    "asn": Field(Service, Service.asn_id, "lookup", Asn),
+    "country": Field(Service, Service.country_id, "lookup", Country),
+    "domain": Field(Service, Service.domain, "str"),
+    "banner": Field(Service, Service.banner_data, "str"),
+    "timestamp": Field(Service, Service.timestamp, "datetime"),
+    "fruit_id": Field(Service, Service.fruit_id, "int"),
+    "owner_id": Field(Service, Service.owner_id, "int"),
+    "fruit.name": Field(Fruit, Fruit.name, "str"),
+    "fruit.country": Field(Fruit, Fruit.country_id, "lookup", Country),
+    "fruit.type_id": Field(Fruit, Fruit.fruit_type_id, "int"),
+    "fruit.date_picked": Field(Fruit, Fruit.date_picked, "datetime"),
+    "owner.name": Field(Owner, Owner.name, "str"),
+    "owner.description": Field(Owner, Owner.description, "str"),
+}
+
+# Tables a compiled filter reads
+TABLES = ("services", "fruits", "owners", "countries", "asns")
+
+# Service column referencing each related model
+_RELATIONS = {Fruit: Service.fruit_id, Owner: Service.owner_id}
+
+_ORDERED = {"eq", "ne", "lt", "le", "gt", "ge", "between", "in", "not_in", "is_null"}
+_TEXT = {"eq", "ne", "in", "not_in", "contains", "startswith", "is_null"}
+OPERATORS = {
+    "int": _ORDERED,
+    "datetime": _ORDERED,
+    "ip": _ORDERED | {"cidr", "contains", "startswith"},
+    "str": _TEXT,
+    "lookup": _TEXT,
+}
+
+_ALIASES = {"=": "eq", "==": "eq", "!=": "ne", "<": "lt", "<=": "le", ">": "gt", ">=": "ge"}
+
+# Bounds on the size of a tree, so a stored filter cannot produce an
+# arbitrarily large statement
+MAX_TERMS = 200
+MAX_LIST = 1000
+
+def _coerce(kind: str, value: Any):
+    if kind == "int":
+        if isinstance(value, bool) or not isinstance(value, (int, str)):
+            raise FilterError(f"Expected an integer, got {value!r}")
+        try:
+            return int(value)
+        except ValueError:
+            raise FilterError(f"Expected an integer, got {value!r}")
+    if kind == "datetime":
+        try:
+            return datetime.fromisoformat(value)
+        except (TypeError, ValueError):
+            raise FilterError(f"Expected an ISO date, got {value!r}")
+    if kind == "ip":
+        key = ip_key(value) if isinstance(value, str) else None
+        if key is None:
+            raise FilterError(f"Expected an IP address, got {value!r}")
+        return key
+    if not isinstance(value, str):
+        raise FilterError(f"Expected a string, got {value!r}")
+    return value
+
+def _values(kind: str, value: Any, count: Optional[int] = None) -> list:
+    if not isinstance(value, list) or not value:
+        raise FilterError(f"Expected a non-empty list, got {value!r}")
+    if count is not None and len(value) != count:
+        raise FilterError(f"Expected {count} values, got {len(value)}")
+    if len(value) > MAX_LIST:
+        raise FilterError(f"At most {MAX_LIST} values per list")
+    return [_coerce(kind, v) for v in value]
+
+def _cidr_range(value: Any):
+    try:
+        network = ipaddress.ip_network(value, strict=False)
+    except (TypeError, ValueError):
+        raise FilterError(f"Expected a CIDR block, got {value!r}")
+    return ip_key(str(network[0])), ip_key(str(network[-1]))
+
+def _compare(column, kind: str, operator: str, value: Any):
+    if operator in ("in", "not_in"):
+        values = _values(kind, value)
+        return column.in_(values) if operator == "in" else column.not_in(values)
+    if operator == "between":
+        low, high = _values(kind, value, 2)
+        return column.between(low, high)
+    value = _coerce(kind, value)
+    return {
+        "eq": column.__eq__, "ne": column.__ne__,
+        "lt": column.__lt__, "le": column.__le__,
+        "gt": column.__gt__, "ge": column.__ge__,
+    }[operator](value)
+
+def _leaf(field: Field, operator: str, value: Any):
+    column = field.column
+    if operator == "is_null":
+        if not isinstance(value, bool):
+            raise FilterError("is_null takes true or false")
+        return column.is_(None) if value else column.isnot(None)
+
+    if field.kind == "lookup":
+        # Match names in the small lookup table, then compare ids
+        names = field.lookup.name
+        if operator in ("contains", "startswith"):
+            pattern = _coerce("str", value)
+            matched = names.icontains(pattern) if operator == "contains" else names.istartswith(pattern)
+            return column.in_(select(field.lookup.id).where(matched))
+        if operator in ("eq", "ne"):
+            lookup_id = select(field.lookup.id).where(names == _coerce("str", value)).scalar_subquery()
+            return column == lookup_id if operator == "eq" else column != lookup_id
+        ids = select(field.lookup.id).where(names.in_(_values("str", value)))
+        return column.in_(ids) if operator == "in" else column.not_in(ids)
+
+    if operator == "contains":
+        return trigram.contains(field.model, _coerce("str", value), column)
+    if operator == "startswith":
+        return column.istartswith(_coerce("str", value))
+    if field.kind == "ip":
+        if operator == "cidr":
+            return Service.ip_key.between(*_cidr_range(value))
+        return _compare(Service.ip_key, "ip", operator, value)
+    return _compare(column, field.kind, operator, value)
+
+def _node(node: Any, budget: list):
+    budget[0] -= 1
+    if budget[0] < 0:
+        raise FilterError(f"At most {MAX_TERMS} terms per filter")
+    if not isinstance(node, dict):
+        raise FilterError(f"Expected an object, got {node!r}")
+
+    if "criteria" in node:
+        node = {"and": node["criteria"]}
+    # An empty filter matches everything
+    if not node or node == {"and": []}:
+        return true()
+    for combinator, combine in (("and", and_), ("or", or_)):
+        if combinator in node:
+            children = node[combinator]
+            if not isinstance(children, list) or not children:
+                raise FilterError(f"{combinator!r} takes a non-empty list")
+            return combine(*(_node(child, budget) for child in children))
+    if "not" in node:
+        return not_(_node(node["not"], budget))
+
+    name = node.get("field")
+    field = FIELDS.get(name)
+    if field is None:
+        raise FilterError(f"Unknown field {name!r}")
+    operator = node.get("operator", "eq")
+    operator = _ALIASES.get(operator, operator)
+    if operator not in OPERATORS[field.kind]:
+        raise FilterError(f"Operator {operator!r} does not apply to {name}")
+    if "value" not in node:
+        raise FilterError(f"Missing value for {name}")
+
+    criterion = _leaf(field, operator, node["value"])
+    if field.model is not Service:
+        criterion = _RELATIONS[field.model].in_(select(field.model.id).where(criterion))
+    return criterion
+
+def compile_criteria(criteria: Any):
+    """Validate a filter tree and compile it to a criterion on Service."""
+    return _node(criteria, [MAX_TERMS])
+
+_plans = TTLCache(ttl=settings.FILTER_PLAN_CACHE_TTL, maxsize=settings.FILTER_PLAN_CACHE_SIZE)
+
+def for_filter(saved_filter: SavedFilter):
+    """The compiled criterion of a saved filter, cached until it is modified."""
+    key = (saved_filter.id, saved_filter.modified_at)
+    criterion = _plans.get(key)
+    if criterion is None:
+        try:
+            criteria = json.loads(saved_filter.filter_criteria)
+        except (TypeError, ValueError):
+            raise FilterError("Stored filter is not valid JSON")
+        criterion = compile_criteria(criteria)
+        _plans.set(key, criterion)
+    return criterion
+
+def clear() -> None:
+    _plans.clear()
@@ -0,0 +1,204 @@
+# File: app/filter_results.py
+# Materialized saved-filter results.
+#
+# A materialized filter has its matching service ids stored in
+# `filter_results`, alongside the filter revision (modified_at) and the
+# data versions of the tables the filter reads. While both still match,
+# opening the filter pages through the stored ids instead of re-running
+# the query; once either moves on, the stored rows are ignored and a
+# background worker recomputes them while reads fall back to the live query.
+#
+# Filters are materialized when their owner asks for it (`materialized`),
+# or while they are among the most-opened shared filters: opens are counted
+# per process, and a warming pass every FILTER_WARM_INTERVAL seconds
+# refreshes the stale results of the top FILTER_WARM_COUNT.
+#
+# Stored rows go with their filter and with their services. The foreign
+# keys cascade on databases that enforce them; SQLite does not, so ORM
+# deletes are handled by a flush hook, and Core deletes of saved filters or
+# services must call `discard` or `discard_services` (app.cascade does).
+import logging
+import threading
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Iterable, Optional, Set
+
+from sqlalchemy import delete, event, insert, literal, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+
+from app import data_versions, filter_dsl
+from app.config import settings
+from app.models import FilterMaterialization, FilterResult, SavedFilter, Service
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.FILTER_REFRESH_WORKERS,
+    thread_name_prefix="filter-refresh"
+)
+
+# Filters queued for a refresh, and opens of shared filters since the last warming pass
+_pending: Set[int] = set()
+_opens: Counter = Counter()
+_lock = threading.Lock()
+
+def _versions(db: Session) -> str:
+    versions, _ = data_versions.get_versions(db, *filter_dsl.TABLES)
+    return ",".join(map(str, versions))
+
+def matches(filter_id: int):
+    """Criterion on Service for the stored results of `filter_id`."""
+    return Service.id.in_(
+        select(FilterResult.service_id).where(FilterResult.filter_id == filter_id)
+    )
+
+def current(db: Session, saved_filter: SavedFilter) -> Optional[FilterMaterialization]:
+    """The filter's materialization if its stored results are up to date."""
+    materialization = db.get(FilterMaterialization, saved_filter.id)
+    if (materialization is None
+            or materialization.filter_modified_at != saved_filter.modified_at
+            or materialization.data_versions != _versions(db)):
+        return None
+    return materialization
+
+def refresh(db: Session, saved_filter: SavedFilter) -> int:
+    """Recompute the filter's stored results; returns the row count. The caller commits."""
+    criterion = filter_dsl.for_filter(saved_filter)
+    # Versions are read first: a write landing during the refresh leaves
+    # the results marked stale rather than missing it
+    versions = _versions(db)
+    db.execute(delete(FilterResult).where(FilterResult.filter_id == saved_filter.id))
+    row_count = db.execute(
+        insert(FilterResult).from_select(
+            ["filter_id", "service_id"],
+            select(literal(saved_filter.id), Service.id).where(criterion)
+        )
+    ).rowcount
+    db.merge(FilterMaterialization(
+        filter_id=saved_filter.id,
+        filter_modified_at=saved_filter.modified_at,
+        data_versions=versions,
+        row_count=row_count,
+        refreshed_at=datetime.utcnow()
+    ))
+    return row_count
+
+def _refresh_job(engine: Engine, filter_id: int) -> None:
+    try:
+        with Session(bind=engine) as db:
+            saved_filter = db.get(SavedFilter, filter_id)
+            if saved_filter is not None and current(db, saved_filter) is None:
+                refresh(db, saved_filter)
+                db.commit()
+    except Exception:
+        logger.exception("Refreshing results of filter %s failed", filter_id)
+    finally:
+        with _lock:
+            _pending.discard(filter_id)
+
+def schedule(db: Session, filter_id: int) -> None:
+    """Queue a background refresh of the filter, unless one is already queued."""
+    with _lock:
+        if filter_id in _pending:
+            return
+        _pending.add(filter_id)
+    _executor.submit(_refresh_job, db.get_bind(), filter_id)
+
+def _popular(filter_id: int) -> bool:
+    return _opens[filter_id] >= settings.FILTER_WARM_MIN_OPENS
+
+def open_filter(db: Session, saved_filter: SavedFilter) -> Optional[FilterMaterialization]:
+    """
+    Record an open of the filter and return its materialization when the
+    stored results are current. Stale results of a materialized or popular
+    filter are refreshed in the background.
+    """
+    if saved_filter.group_id:
+        with _lock:
+            _opens[saved_filter.id] += 1
+    if not saved_filter.materialized and not _popular(saved_filter.id):
+        return None
+    materialization = current(db, saved_filter)
+    if materialization is None:
+        schedule(db, saved_filter.id)
+    return materialization
+
+def warm(db: Session) -> int:
+    """
+    Refresh the stale results of the most-opened shared filters and decay
+    the open counts. Returns the number of filters refreshed.
+    """
+    with _lock:
+        popular = [
+            filter_id for filter_id, opens in _opens.most_common(settings.FILTER_WARM_COUNT)
+            if opens >= settings.FILTER_WARM_MIN_OPENS
+        ]
+        # Halve the counts so filters that stop being opened drop out
+        for filter_id in list(_opens):
+            _opens[filter_id] //= 2
+            if not _opens[filter_id]:
+                del _opens[filter_id]
+    refreshed = 0
+    for filter_id in popular:
+        saved_filter = db.get(SavedFilter, filter_id)
+        if saved_filter is None or current(db, saved_filter) is not None:
+            continue
+        try:
+            refresh(db, saved_filter)
+            db.commit()
+            refreshed += 1
+        except filter_dsl.FilterError:
+            db.rollback()
+            logger.warning("Filter %s has an invalid expression", filter_id)
+    return refreshed
+
+def start_warming(engine: Engine) -> threading.Event:
+    """Run `warm` every FILTER_WARM_INTERVAL seconds on a daemon thread; set the event to stop."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.wait(settings.FILTER_WARM_INTERVAL):
+            try:
+                with Session(bind=engine) as db:
+                    warm(db)
+            except Exception:
+                logger.exception("Warming filter results failed")
+
+    threading.Thread(target=run, name="filter-warm", daemon=True).start()
+    return stop
+
+CHUNK_SIZE = 500
+
+def _chunks(ids: Iterable[int]):
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+def discard(db: Session, filter_ids: Iterable[int]) -> None:
+    """Delete the stored results of the given filters."""
+    connection = db.connection()
+    for chunk in _chunks(filter_ids):
+        connection.execute(delete(FilterResult).where(FilterResult.filter_id.in_(chunk)))
+        connection.execute(
+            delete(FilterMaterialization).where(FilterMaterialization.filter_id.in_(chunk))
+        )
+
+def discard_services(db: Session, service_ids: Iterable[int]) -> None:
+    """
+    Delete stored rows of the given services. The materializations they
+    belonged to are already stale, since the services table changed.
+    """
+    connection = db.connection()
+    for chunk in _chunks(service_ids):
+        connection.execute(delete(FilterResult).where(FilterResult.service_id.in_(chunk)))
+
+@event.listens_for(Session, "after_flush")
+def _discard_deleted(session, flush_context):
+    filter_ids = [obj.id for obj in session.deleted if isinstance(obj, SavedFilter)]
+    service_ids = [obj.id for obj in session.deleted if isinstance(obj, Service)]
+    if filter_ids:
+        discard(session, filter_ids)
+    if service_ids:
+        discard_services(session, service_ids)
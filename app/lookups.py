@@ -0,0 +1,90 @@
+# File: app/lookups.py
+# Dictionary-encoded strings.
+#
+# Countries and ASNs are stored once in lookup tables and referenced by
+# integer id. The models keep their string attributes (Service.country,
+# Service.asn, Fruit.country_of_origin): entity loads read them through a
+# correlated subquery on the lookup table, list queries join the lookup
+# tables instead (see app.bench_lookups), and assigned strings are resolved
+# to ids by a flush hook, which creates lookup rows the first time a string
+# is seen.
+# Empty strings are stored as NULL.
+#
+# Resolved ids are cached per process. Lookup rows are never updated or
+# deleted, so a cached id stays valid; ids created by a transaction are only
+# cached once it commits.
+from typing import Optional
+
+from sqlalchemy import event, inspect, insert, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.config import settings
+from app.models import Asn, Country, Fruit, Service
+from app.utils.cache import TTLCache
+
+# (model, string attribute, id attribute, lookup model)
+ENCODED = (
+    (Service, "country", "country_id", Country),
+    (Service, "asn", "asn_id", Asn),
+    (Fruit, "country_of_origin", "country_id", Country),
+)
+
+_ENCODED_MODELS = tuple({model for model, *_ in ENCODED})
+
+_cache = TTLCache(ttl=settings.LOOKUP_CACHE_TTL, maxsize=settings.LOOKUP_CACHE_SIZE)
+
+def find_id(db: Session, lookup, name: Optional[str]) -> Optional[int]:
+    """Id of an existing lookup row, without creating one."""
+    if not name:
+        return None
+    key = (lookup.__tablename__, name)
+    lookup_id = _cache.get(key)
+    if lookup_id is None:
+        # Rows this transaction created are not cached until it commits
+        created = db.info.get("new_lookup_ids", {})
+        if key in created:
+            return created[key]
+        lookup_id = db.scalar(select(lookup.id).where(lookup.name == name))
+        if lookup_id is not None:
+            _cache.set(key, lookup_id)
+    return lookup_id
+
+def resolve(db: Session, lookup, name: Optional[str]) -> Optional[int]:
+    """Id for `name` in `lookup`, inserting the row if it is new."""
+    lookup_id = find_id(db, lookup, name)
+    if lookup_id is not None or not name:
+        return lookup_id
+    connection = db.connection()
+    try:
+        # Another writer may insert the same name first. A connection-level
+        # savepoint, since this runs inside a flush
+        with connection.begin_nested():
+            lookup_id = connection.execute(
+                insert(lookup).values(name=name)
+            ).inserted_primary_key[0]
+    except IntegrityError:
+        return find_id(db, lookup, name)
+    data_versions.mark_changed(db, lookup.__tablename__)
+    db.info.setdefault("new_lookup_ids", {})[(lookup.__tablename__, name)] = lookup_id
+    return lookup_id
+
+@event.listens_for(Session, "before_flush")
+def _resolve_flushed(session, flush_context, instances):
+    for obj in list(session.new) + list(session.dirty):
+        if not isinstance(obj, _ENCODED_MODELS):
+            continue
+        state = inspect(obj)
+        for model, attribute, id_attribute, lookup in ENCODED:
+            if isinstance(obj, model) and state.attrs[attribute].history.has_changes():
+                setattr(obj, id_attribute, resolve(session, lookup, getattr(obj, attribute)))
+
+@event.listens_for(Session, "after_commit")
+def _cache_committed(session):
+    for key, lookup_id in session.info.pop("new_lookup_ids", {}).items():
+        _cache.set(key, lookup_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("new_lookup_ids", None)
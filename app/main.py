@@ -2,7 +2,6 @@
 from fastapi import FastAPI, Request, status, Depends
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import JSONResponse, HTMLResponse
 from fastapi.exceptions import RequestValidationError
 from sqlalchemy.orm import Session
@@ -12,21 +11,24 @@ from starlette.authentication import (
     AuthenticationBackend, AuthenticationError, SimpleUser, 
     UnauthenticatedUser, AuthCredentials
 )
-import jwt
-from jwt import PyJWTError
 import uvicorn
 
 from app.utils.messages import get_flashed_messages
-from app.database import engine, Base, get_db
+from app.logging_config import setup_logging, RequestIdMiddleware
+from app.templating import templates, precompile_templates
+from app.database import engine, get_db, DBSessionMiddleware
+from app.migrate import upgrade
 from app.config import settings
 from app.routes import auth, fruits, fruit_types, recipes, groups, filters
-from app.routes import services, owners
+from app.routes import services, owners, typeahead, search
 
-from app.dependencies import get_current_user
-import app.crud as crud
+from app.dependencies import get_current_user, decode_token, resolve_user
+from app import dashboard, filter_results
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
+setup_logging()
+
+# Create database tables and apply additive schema changes
+upgrade(engine)
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -38,32 +40,16 @@ app = FastAPI(
 # JWT Authentication Backend
 class JWTAuthenticationBackend(AuthenticationBackend):
     async def authenticate(self, request):
-        if "access_token" not in request.cookies:
-            # Return None if no token (this makes request.user.is_authenticated = False)
+        if decode_token(request) is None:
+            # Return None if no valid token (this makes request.user.is_authenticated = False)
             return None
 
-        token = request.cookies["access_token"]
-        if token.startswith("Bearer "):
-            token = token[7:]
-
         try:
-            payload = jwt.decode(
-                token, 
-                settings.SECRET_KEY, 
-                algorithms=[settings.ALGORITHM]
-            )
-            username = payload.get("sub")
-            if username is None:
-                return None
-            
-            db = next(get_db())
-            user = crud.get_user_by_username(db, username)
+            user = resolve_user(request, get_db(request))
             if user is None:
                 return None
             
-            return AuthCredentials(["authenticated"]), SimpleUser(username)
-        except jwt.PyJWTError:
-            return None
+            return AuthCredentials(["authenticated"]), SimpleUser(user.username)
         except Exception:
             return None
 
@@ -89,11 +75,25 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Middleware added last runs outermost. The session middleware wraps
+# authentication and the routes, so the request's session outlives streaming
+# bodies; the request id wraps it in turn, so logging while closing the
+# session still carries the id.
+app.add_middleware(DBSessionMiddleware)
+app.add_middleware(RequestIdMiddleware)
+
 # Mount static files
 app.mount("/static", StaticFiles(directory="app/static"), name="static")
 
-# Initialize templates
-templates = Jinja2Templates(directory="app/templates")
+@app.on_event("startup")
+async def compile_templates():
+    """Compile all templates (or load them from the bytecode cache) before serving."""
+    precompile_templates()
+
+@app.on_event("startup")
+async def warm_filter_results():
+    """Keep the results of the most-opened shared filters materialized."""
+    filter_results.start_warming(engine)
 
 # Exception handlers
 @app.exception_handler(RequestValidationError)
@@ -160,6 +160,18 @@ app.include_router(
     tags=["owners"]
 )
 
+app.include_router(
+    typeahead.router,
+    prefix="/typeahead",
+    tags=["typeahead"]
+)
+
+app.include_router(
+    search.router,
+    prefix="/search",
+    tags=["search"]
+)
+
 @app.get("/", response_class=HTMLResponse)
 async def root(
     request: Request,
@@ -176,12 +188,8 @@ async def root(
     
     # Add stats for authenticated users
     if request.user.is_authenticated:
-        stats = {
-            "total_recipes": crud.get_recipe_count(db),
-            "total_types": crud.get_fruit_type_count(db),
-            "total_filters": crud.get_filter_count(db, request.user.username)
-        }
-        context["stats"] = stats
+        user = resolve_user(request, db)
+        context["stats"] = dashboard.get_dashboard_stats(db, user.id)
     
     return templates.TemplateResponse("index.html", context)
 
@@ -0,0 +1,106 @@
+# File: app/memberships.py
+# Group membership checks.
+#
+# "Is user U in group G" is a single probe of the (user_id, group_id) index
+# on group_member, and "groups of user U" a range scan of it; neither loads a
+# group's member collection. Each user's set of group ids is cached per
+# process together with the committed `group_member` data version it was
+# read at, and an entry is only used while that version is current, so
+# writes made by other processes are seen on their next check. Writers record
+# the users whose membership they change with `changed`, and those entries
+# are also dropped once the transaction commits.
+import threading
+from typing import FrozenSet, Optional
+
+from sqlalchemy import event, exists, select
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.config import settings
+from app.models import group_member
+from app.utils.cache import TTLCache
+
+_cache = TTLCache(ttl=settings.MEMBERSHIP_CACHE_TTL, maxsize=settings.MEMBERSHIP_CACHE_SIZE)
+
+# Bumped on every invalidation; a load that raced with a write is not stored
+_generation = 0
+_lock = threading.Lock()
+
+def member_exists(user_id: int, group_id) -> exists:
+    """EXISTS clause for `user_id` being a member of `group_id` (a value or column)."""
+    return exists().where(
+        group_member.c.user_id == user_id,
+        group_member.c.group_id == group_id
+    )
+
+def _pending(db: Session, user_id: int) -> bool:
+    # Uncommitted changes of this transaction are neither read from nor stored in the cache
+    return user_id in db.info.get("membership_changes", ())
+
+def _version(db: Session) -> int:
+    # Read once per transaction; this transaction's own writes are `_pending`
+    if "membership_version" not in db.info:
+        (version,), _ = data_versions.get_versions(db, group_member.name)
+        db.info["membership_version"] = version
+    return db.info["membership_version"]
+
+def _cached(db: Session, user_id: int) -> Optional[FrozenSet[int]]:
+    if _pending(db, user_id):
+        return None
+    entry = _cache.get(user_id)
+    if entry is None:
+        return None
+    version, groups = entry
+    return groups if version == _version(db) else None
+
+def group_ids(db: Session, user_id: int) -> FrozenSet[int]:
+    """Ids of the groups `user_id` belongs to."""
+    groups = _cached(db, user_id)
+    if groups is None:
+        generation = _generation
+        # The version is read first, so a concurrent write leaves it behind
+        version = _version(db)
+        groups = frozenset(db.scalars(
+            select(group_member.c.group_id).where(group_member.c.user_id == user_id)
+        ))
+        with _lock:
+            if generation == _generation and not _pending(db, user_id):
+                _cache.set(user_id, (version, groups))
+    return groups
+
+def is_member(db: Session, user_id: int, group_id: int) -> bool:
+    """Whether `user_id` belongs to `group_id`; answered from the cached set when present."""
+    groups = _cached(db, user_id)
+    if groups is not None:
+        return group_id in groups
+    return db.scalar(select(member_exists(user_id, group_id)))
+
+def changed(db: Session, *user_ids: int) -> None:
+    """Record users whose membership this transaction changes."""
+    db.info.setdefault("membership_changes", set()).update(user_ids)
+    data_versions.mark_changed(db, group_member.name)
+
+def invalidate(*user_ids: int) -> None:
+    global _generation
+    with _lock:
+        _generation += 1
+        for user_id in user_ids:
+            _cache.pop(user_id)
+
+def clear() -> None:
+    _cache.clear()
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_committed(session):
+    user_ids = session.info.pop("membership_changes", None)
+    if user_ids:
+        invalidate(*user_ids)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_rolled_back(session):
+    session.info.pop("membership_changes", None)
+
+@event.listens_for(Session, "after_transaction_end")
+def _forget_version(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("membership_version", None)
@@ -0,0 +1,249 @@
+# File: app/migrate.py
+# Additive schema upgrades and data maintenance.
+#
+#   python -m app.migrate                      create missing tables, columns and indexes
+#   python -m app.migrate reconcile-counters   recompute the denormalized counters
+#   python -m app.migrate rebuild-search       rebuild the search documents, recipe and trigram indexes
+#                                              and the filter access lists
+#   python -m app.migrate drop-legacy-columns  drop the string columns replaced by lookup ids
+#
+# `upgrade` runs at every app start and only adds: it never drops or
+# rewrites existing data. Run `reconcile-counters` and `rebuild-search`
+# after loading data with scripts that bypass the app's session (raw SQL,
+# other tools) so the counters and search indexes match the rows.
+#
+# `drop-legacy-columns` is destructive and is never run implicitly. Back up
+# the database first, and run it once, after every worker runs a version
+# that reads the lookup ids: rows older workers write only carry the string.
+import argparse
+import logging
+from typing import List
+
+from sqlalchemy import bindparam, inspect, select, text, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session
+from sqlalchemy.schema import CreateColumn
+
+from app import counters, filter_access, recipe_search, search, trigram
+from app.models import Base, Service, ip_key
+
+logger = logging.getLogger(__name__)
+
+# Virtual tables the models do not describe: name -> (DDL, backfill(db))
+VIRTUAL_TABLES = {
+    search.TABLE_NAME: (search.CREATE_TABLE, search.rebuild),
+    recipe_search.TABLE_NAME: (recipe_search.CREATE_TABLE, recipe_search.rebuild),
+    **{
+        name: (trigram.create_table_ddl(name), lambda db, name=name: trigram.rebuild(db, name))
+        for name in trigram.TRIGRAM_TABLES
+    },
+}
+
+# Tables derived from other rows: name -> backfill(db), run when the table is new
+DERIVED_TABLES = {
+    filter_access.TABLE_NAME: filter_access.rebuild,
+}
+
+def _add_missing_columns(engine: Engine) -> List[str]:
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                ddl = CreateColumn(column).compile(dialect=engine.dialect)
+                connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+                added.append(f"{table.name}.{column.name}")
+    return added
+
+# String columns replaced by lookup ids:
+# (table, legacy column, id column, lookup table, legacy indexes on the column)
+ENCODED_COLUMNS = (
+    ("services", "country", "country_id", "countries", ("ix_services_country_lower",)),
+    ("services", "asn", "asn_id", "asns", ("ix_services_asn_lower",)),
+    ("fruits", "country_of_origin", "country_id", "countries", ()),
+)
+
+def _columns(engine: Engine, table: str) -> set:
+    return {column["name"] for column in inspect(engine).get_columns(table)}
+
+def _encode_lookup_columns(engine: Engine) -> List[str]:
+    """
+    Fill empty lookup id columns from the legacy string columns they replace,
+    which also picks up rows written by workers that predate the lookups. The
+    string columns are left in place.
+    """
+    encoded = []
+    with engine.begin() as connection:
+        for table, column, id_column, lookup, _ in ENCODED_COLUMNS:
+            if column not in _columns(engine, table):
+                continue
+            pending = (f"{table}.{id_column} IS NULL "
+                       f"AND {table}.{column} IS NOT NULL AND {table}.{column} != ''")
+            connection.execute(text(
+                f"INSERT INTO {lookup} (name) SELECT DISTINCT {column} FROM {table} "
+                f"WHERE {pending} AND {column} NOT IN (SELECT name FROM {lookup})"
+            ))
+            result = connection.execute(text(
+                f"UPDATE {table} SET {id_column} = "
+                f"(SELECT id FROM {lookup} WHERE name = {table}.{column}) WHERE {pending}"
+            ))
+            if result.rowcount:
+                encoded.append(f"{table}.{column}")
+    return encoded
+
+def drop_legacy_columns(engine: Engine) -> List[str]:
+    """
+    Drop the legacy string columns and their indexes, after encoding any
+    rows written since the last upgrade.
+    """
+    _encode_lookup_columns(engine)
+    dropped = []
+    with engine.begin() as connection:
+        for table, column, _, _, indexes in ENCODED_COLUMNS:
+            if column not in _columns(engine, table):
+                continue
+            for index in indexes:
+                connection.execute(text(f"DROP INDEX IF EXISTS {index}"))
+            # Needs SQLite 3.35+
+            connection.execute(text(f"ALTER TABLE {table} DROP COLUMN {column}"))
+            dropped.append(f"{table}.{column}")
+    return dropped
+
+def _index_names(connection, inspector, table: str) -> set:
+    if connection.dialect.name == "sqlite":
+        # The inspector skips expression indexes such as lower(name)
+        return {row[1] for row in connection.exec_driver_sql(f"PRAGMA index_list('{table}')")}
+    return {index["name"] for index in inspector.get_indexes(table)}
+
+def _add_missing_indexes(engine: Engine) -> List[str]:
+    inspector = inspect(engine)
+    added = []
+    with engine.begin() as connection:
+        for table in Base.metadata.sorted_tables:
+            existing = _index_names(connection, inspector, table.name)
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(connection)
+                    added.append(index.name)
+    return added
+
+def _create_virtual_tables(engine: Engine) -> List[str]:
+    existing = set(inspect(engine).get_table_names())
+    created = []
+    with engine.begin() as connection:
+        for name, (ddl, _) in VIRTUAL_TABLES.items():
+            if name not in existing:
+                connection.execute(text(ddl))
+                created.append(name)
+    return created
+
+def _backfill_ip_keys(db: Session) -> None:
+    services = Service.__table__
+    rows = db.execute(select(services.c.id, services.c.ip)).all()
+    statement = (
+        update(services)
+        .where(services.c.id == bindparam("row_id"))
+        .values(ip_key=bindparam("key"))
+    )
+    for start in range(0, len(rows), 1000):
+        db.connection().execute(statement, [
+            {"row_id": row.id, "key": ip_key(row.ip)} for row in rows[start:start + 1000]
+        ])
+
+# Columns computed in Python from other columns: "table.column" -> backfill(db)
+COMPUTED_COLUMNS = {
+    "services.ip_key": _backfill_ip_keys,
+}
+
+def _counter_columns() -> set:
+    return {
+        f"{table}.{name}"
+        for table, (_, columns) in counters.COUNTERS.items()
+        for name in columns
+    }
+
+def upgrade(engine: Engine) -> List[str]:
+    """
+    Bring the database up to the models: create missing tables, add missing
+    columns and indexes, fill new lookup id columns from the legacy string
+    columns, create missing virtual tables and backfill newly added counters,
+    indexes and derived tables. Returns the columns that were added.
+    """
+    new_tables = set(Base.metadata.tables) - set(inspect(engine).get_table_names())
+    Base.metadata.create_all(bind=engine)
+    added = _add_missing_columns(engine)
+    for name in added:
+        logger.info("Added column %s", name)
+    for name in _encode_lookup_columns(engine):
+        logger.info("Copied %s into its lookup table", name)
+    for name in _add_missing_indexes(engine):
+        logger.info("Created index %s", name)
+    created = _create_virtual_tables(engine)
+
+    if _counter_columns() & set(added):
+        with Session(bind=engine) as db:
+            counters.reconcile(db)
+            db.commit()
+        logger.info("Backfilled relationship counters")
+    for name in set(COMPUTED_COLUMNS) & set(added):
+        with Session(bind=engine) as db:
+            COMPUTED_COLUMNS[name](db)
+            db.commit()
+        logger.info("Backfilled %s", name)
+    for name in created:
+        with Session(bind=engine) as db:
+            VIRTUAL_TABLES[name][1](db)
+            db.commit()
+        logger.info("Created and filled %s", name)
+    for name in new_tables & set(DERIVED_TABLES):
+        with Session(bind=engine) as db:
+            DERIVED_TABLES[name](db)
+            db.commit()
+        logger.info("Filled %s", name)
+    return added
+
+def reconcile_counters(engine: Engine) -> dict:
+    """Recompute every counter; returns the drifted row count per table."""
+    with Session(bind=engine) as db:
+        drifted = counters.reconcile(db)
+        db.commit()
+    return drifted
+
+def rebuild_search(engine: Engine) -> None:
+    """
+    Refill every virtual table (search documents, recipe search, trigram
+    indexes) and derived table (filter access lists).
+    """
+    with Session(bind=engine) as db:
+        for _, backfill in VIRTUAL_TABLES.values():
+            backfill(db)
+        for backfill in DERIVED_TABLES.values():
+            backfill(db)
+        db.commit()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.migrate")
+    parser.add_argument("command", nargs="?", default="upgrade",
+                        choices=["upgrade", "reconcile-counters", "rebuild-search",
+                                 "drop-legacy-columns"])
+    args = parser.parse_args(argv)
+
+    from app.database import engine
+
+    if args.command == "upgrade":
+        upgrade(engine)
+    elif args.command == "rebuild-search":
+        rebuild_search(engine)
+    elif args.command == "drop-legacy-columns":
+        for name in drop_legacy_columns(engine):
+            logger.info("Dropped %s", name)
+    else:
+        for table, rows in reconcile_counters(engine).items():
+            logger.info("%s: %d rows corrected", table, rows)
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(name)s: %(message)s")
+    main()
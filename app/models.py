@@ -1,5 +1,6 @@
 from sqlalchemy import Column, Integer, String, Boolean, ForeignKey, Table, DateTime, Text, JSON
-from sqlalchemy.orm import relationship
+from sqlalchemy import Index, func, select
+from sqlalchemy.orm import column_property, relationship, validates
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 import ipaddress
@@ -10,15 +11,19 @@ Base = declarative_base()
 fruit_type_recipe = Table(
     'fruit_type_recipe',
     Base.metadata,
-    Column('fruit_type_id', Integer, ForeignKey('fruit_types.id')),
-    Column('recipe_id', Integer, ForeignKey('recipes.id'))
+    Column('fruit_type_id', Integer, ForeignKey('fruit_types.id'), index=True),
+    Column('recipe_id', Integer, ForeignKey('recipes.id'), index=True)
 )
 
 group_member = Table(
     'group_member',
     Base.metadata,
     Column('user_id', Integer, ForeignKey('users.id')),
-    Column('group_id', Integer, ForeignKey('groups.id'))
+    Column('group_id', Integer, ForeignKey('groups.id')),
+    # "groups of user U" and "is U in G" are range scans / probes on the first,
+    # member listings use the second
+    Index('ix_group_member_user_group', 'user_id', 'group_id'),
+    Index('ix_group_member_group_user', 'group_id', 'user_id')
 )
 
 class User(Base):
@@ -54,17 +59,67 @@ class Owner(Base):
     contact_info = Column(String(200))
     created_at = Column(DateTime, default=datetime.utcnow)
     
+    # Maintained by app.counters on every write
+    service_count = Column(Integer, nullable=False, default=0, server_default='0', index=True)
+    
     # Relationship to services
     services = relationship('Service', back_populates='owner')
+    
+    # Case-insensitive prefix lookups (typeahead)
+    __table_args__ = (Index('ix_owners_name_lower', func.lower(name)),)
+
+# Lookup tables for strings repeated on many rows; rows store the id and
+# expose the string through a lookup_name attribute (see app.lookups)
+class Country(Base):
+    __tablename__ = 'countries'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(100), unique=True, nullable=False)
+    
+    __table_args__ = (Index('ix_countries_name_lower', func.lower(name)),)
+
+class Asn(Base):
+    __tablename__ = 'asns'
+    
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), unique=True, nullable=False)
+    
+    __table_args__ = (Index('ix_asns_name_lower', func.lower(name)),)
+
+def lookup_name(lookup, foreign_key):
+    """The lookup row's name as a string attribute, resolved back to an id on flush."""
+    return column_property(
+        select(lookup.name)
+        .where(lookup.id == foreign_key)
+        .correlate_except(lookup)
+        .scalar_subquery()
+    )
+
+def ip_key(ip):
+    """
+    Sortable key of an address: 32 hex digits of its IPv6 form, IPv4 mapped
+    into ::ffff:0:0/96, so string order is address order. None if `ip` is
+    not an address.
+    """
+    try:
+        address = ipaddress.ip_address(ip)
+    except ValueError:
+        return None
+    if address.version == 4:
+        address = ipaddress.IPv6Address(f"::ffff:{address}")
+    return f"{int(address):032x}"
 
 class Service(Base):
     __tablename__ = 'services'
     
     id = Column(Integer, primary_key=True)
     ip = Column(String(45), nullable=False)  # Support both IPv4 and IPv6
+    ip_key = Column(String(32), index=True)  # ip_key(ip), for ranges and CIDR blocks
     port = Column(Integer, nullable=False)
-    asn = Column(String(50))
-    country = Column(String(100))
+    asn_id = Column(Integer, ForeignKey('asns.id'), index=True)
+    country_id = Column(Integer, ForeignKey('countries.id'), index=True)
+    asn = lookup_name(Asn, asn_id)
+    country = lookup_name(Country, country_id)
     domain = Column(String(255))
     timestamp = Column(DateTime, default=datetime.utcnow)
     banner_data = Column(Text)
@@ -73,12 +128,20 @@ class Service(Base):
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     # Foreign keys
-    fruit_id = Column(Integer, ForeignKey('fruits.id'))
-    owner_id = Column(Integer, ForeignKey('owners.id'))
+    fruit_id = Column(Integer, ForeignKey('fruits.id'), index=True)
+    owner_id = Column(Integer, ForeignKey('owners.id'), index=True)
     
     # Relationships
     fruit = relationship('Fruit', back_populates='services')
     owner = relationship('Owner', back_populates='services')
+    
+    # Case-insensitive prefix lookups (typeahead)
+    __table_args__ = (Index('ix_services_domain_lower', func.lower(domain)),)
+    
+    @validates('ip')
+    def _set_ip_key(self, key, value):
+        self.ip_key = ip_key(value)
+        return value
 
 class FruitType(Base):
     __tablename__ = 'fruit_types'
@@ -87,6 +150,10 @@ class FruitType(Base):
     name = Column(String(50), unique=True, nullable=False)
     description = Column(String(200))
     
+    # Maintained by app.counters on every write
+    fruit_count = Column(Integer, nullable=False, default=0, server_default='0', index=True)
+    recipe_count = Column(Integer, nullable=False, default=0, server_default='0')
+    
     fruits = relationship('Fruit', back_populates='fruit_type')
     recipes = relationship('Recipe', secondary=fruit_type_recipe, back_populates='fruit_types')
 
@@ -95,12 +162,19 @@ class Fruit(Base):
     
     id = Column(Integer, primary_key=True)
     name = Column(String(100), unique=True, nullable=False)
-    country_of_origin = Column(String(100))
+    country_id = Column(Integer, ForeignKey('countries.id'), index=True)
+    country_of_origin = lookup_name(Country, country_id)
     date_picked = Column(DateTime)
-    fruit_type_id = Column(Integer, ForeignKey('fruit_types.id'), nullable=False)
+    fruit_type_id = Column(Integer, ForeignKey('fruit_types.id'), nullable=False, index=True)
+    
+    # Maintained by app.counters on every write
+    service_count = Column(Integer, nullable=False, default=0, server_default='0', index=True)
     
     fruit_type = relationship('FruitType', back_populates='fruits')
     services = relationship('Service', back_populates='fruit')  # New relationship
+    
+    # Case-insensitive prefix lookups (typeahead)
+    __table_args__ = (Index('ix_fruits_name_lower', func.lower(name)),)
 
 class Recipe(Base):
     __tablename__ = 'recipes'
@@ -128,5 +202,57 @@ class SavedFilter(Base):
     user_id = Column(Integer, ForeignKey('users.id'), nullable=False)
     group_id = Column(Integer, ForeignKey('groups.id'))
     
+    # Keep the matching service ids stored (see app/filter_results.py)
+    materialized = Column(Boolean, nullable=False, default=False, server_default='0')
+    
     user = relationship('User', back_populates='saved_filters')
-    group = relationship('Group', back_populates='shared_filters')
\ No newline at end of file
+    group = relationship('Group', back_populates='shared_filters')
+    
+    # Stored results go with the filter. The database cascades the delete
+    # (on SQLite, which does not enforce foreign keys, app.filter_results
+    # does), so the rows are never loaded just to be deleted
+    results = relationship('FilterResult', cascade='all, delete-orphan', passive_deletes=True)
+    materialization = relationship(
+        'FilterMaterialization', uselist=False, cascade='all, delete-orphan', passive_deletes=True
+    )
+
+class FilterAccess(Base):
+    __tablename__ = 'filter_access'
+    
+    # One row per filter a user can see, as its owner or through a group.
+    # Maintained by app/filter_access.py; the primary key orders a user's
+    # rows together, so listing them is a single range scan
+    user_id = Column(Integer, ForeignKey('users.id'), primary_key=True)
+    filter_id = Column(Integer, ForeignKey('saved_filters.id'), primary_key=True, index=True)
+
+class FilterResult(Base):
+    __tablename__ = 'filter_results'
+    
+    # Materialized matches of a saved filter, in service id order
+    filter_id = Column(Integer, ForeignKey('saved_filters.id', ondelete='CASCADE'), primary_key=True)
+    service_id = Column(
+        Integer, ForeignKey('services.id', ondelete='CASCADE'), primary_key=True, index=True
+    )
+
+class FilterMaterialization(Base):
+    __tablename__ = 'filter_materializations'
+    
+    # What a filter's stored results were computed from; they are current
+    # while both the filter revision and the data versions still match
+    filter_id = Column(Integer, ForeignKey('saved_filters.id', ondelete='CASCADE'), primary_key=True)
+    filter_modified_at = Column(DateTime, nullable=False)
+    data_versions = Column(String(200), nullable=False)
+    row_count = Column(Integer, nullable=False)
+    refreshed_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+class DataVersion(Base):
+    __tablename__ = 'data_versions'
+    
+    # One row per table, bumped in the same transaction as every write to it
+    table_name = Column(String(100), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
+    modified_at = Column(DateTime, nullable=False, default=datetime.utcnow)
+
+# Writing a lookup_name attribute only persists through the flush hook that
+# resolves names to ids, so register it wherever the models are used
+from app import lookups  # noqa: E402,F401
@@ -0,0 +1,93 @@
+# File: app/recipe_matching.py
+# Match recipes against a fruit inventory ("what can I make with A, B, C?").
+#
+# Each recipe's fruit types are held in memory as an integer bitmask with one
+# bit per fruit type. The inventory becomes a mask too, and every mode is a
+# single pass over the catalog with bitwise operations:
+#
+#   all     recipes using every inventory type     mask & inventory == inventory
+#   any     recipes using at least one of them     mask & inventory != 0
+#   subset  recipes makeable from them alone       mask & ~inventory == 0
+#
+# Matches are ranked by coverage: most inventory types used first, then
+# fewest types missing. The index is rebuilt when the committed versions of
+# the recipe tables change, so writes from any process are picked up by the
+# next query.
+import threading
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.models import Recipe, fruit_type_recipe
+
+MODES = ("all", "any", "subset")
+
+# Tables the masks are built from
+_TABLES = ("recipes", "fruit_type_recipe")
+
+class _Index(NamedTuple):
+    versions: tuple
+    bits: Dict[int, int]  # fruit type id -> bit position
+    recipe_ids: List[int]
+    masks: List[int]  # parallel to recipe_ids
+
+class Match(NamedTuple):
+    recipe_id: int
+    matched: int  # inventory types the recipe uses
+    required: int  # fruit types the recipe uses
+
+_index: Optional[_Index] = None
+_lock = threading.Lock()
+
+def _load(db: Session, versions: tuple) -> _Index:
+    masks = dict.fromkeys(db.scalars(select(Recipe.id).order_by(Recipe.id)), 0)
+    bits: Dict[int, int] = {}
+    links = fruit_type_recipe.c
+    for recipe_id, fruit_type_id in db.execute(select(links.recipe_id, links.fruit_type_id)):
+        if recipe_id in masks and fruit_type_id is not None:
+            masks[recipe_id] |= 1 << bits.setdefault(fruit_type_id, len(bits))
+    return _Index(versions, bits, list(masks), list(masks.values()))
+
+def _current(db: Session) -> _Index:
+    global _index
+    versions, _ = data_versions.get_versions(db, *_TABLES)
+    index = _index
+    if index is None or index.versions != versions:
+        with _lock:
+            index = _index
+            if index is None or index.versions != versions:
+                index = _index = _load(db, versions)
+    return index
+
+def clear() -> None:
+    global _index
+    _index = None
+
+def match(db: Session, fruit_type_ids: Iterable[int], mode: str = "all") -> List[Match]:
+    """Recipes matching the inventory `fruit_type_ids` in `mode`, best coverage first."""
+    if mode not in MODES:
+        raise ValueError(f"Unknown match mode {mode!r}")
+    index = _current(db)
+    inventory = 0
+    for fruit_type_id in set(fruit_type_ids):
+        bit = index.bits.get(fruit_type_id)
+        if bit is None:
+            # No recipe uses this type, so none can use all of them
+            if mode == "all":
+                return []
+            continue
+        inventory |= 1 << bit
+
+    pairs = zip(index.recipe_ids, index.masks)
+    if mode == "all":
+        hits = [(r, m) for r, m in pairs if m & inventory == inventory]
+    elif mode == "any":
+        hits = [(r, m) for r, m in pairs if m & inventory]
+    else:
+        hits = [(r, m) for r, m in pairs if m and not m & ~inventory]
+
+    matches = [Match(r, (m & inventory).bit_count(), m.bit_count()) for r, m in hits]
+    matches.sort(key=lambda h: (-h.matched, h.required - h.matched, h.recipe_id))
+    return matches
@@ -0,0 +1,127 @@
+# File: app/recipe_search.py
+# Full-text recipe search.
+#
+# `recipe_search` is an FTS5 table whose rowid is the recipe id and whose
+# columns copy the recipe's name, description and instructions. Queries are
+# ranked with BM25 (name weighted above description above instructions) and
+# return a highlighted snippet of the best-matching column. The table is kept
+# current by a flush hook; Core and bulk statements must call `reindex`.
+#
+# Query syntax: words must all match; "quoted words" match as a phrase;
+# word* matches a prefix, and so does the last word while it is being typed.
+import re
+from typing import Iterable, Optional
+
+from markupsafe import escape
+from sqlalchemy import column, delete, event, func, insert, inspect, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models import Recipe
+
+TABLE_NAME = "recipe_search"
+
+COLUMNS = ("name", "description", "instructions")
+
+# BM25 weight per column, in COLUMNS order
+WEIGHTS = (10.0, 2.0, 1.0)
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {TABLE_NAME} USING fts5(
+    {', '.join(COLUMNS)},
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+)
+"""
+
+documents = table(TABLE_NAME, column("rowid"), *(column(c) for c in COLUMNS))
+
+# Snippet markers: control characters pass through HTML escaping unchanged
+# and are swapped for <mark> tags afterwards
+_OPEN, _CLOSE = "\x02", "\x03"
+SNIPPET_TOKENS = 12
+
+CHUNK_SIZE = 500
+
+def _insert(connection, ids=None) -> None:
+    query = select(Recipe.id, *(getattr(Recipe, c) for c in COLUMNS))
+    if ids is not None:
+        query = query.where(Recipe.id.in_(ids))
+    connection.execute(insert(documents).from_select(["rowid", *COLUMNS], query))
+
+def reindex(db: Session, ids: Iterable[int]) -> None:
+    """Refresh the rows of the given recipes; missing recipes are dropped."""
+    connection = db.connection()
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        connection.execute(delete(documents).where(documents.c.rowid.in_(chunk)))
+        _insert(connection, chunk)
+
+def rebuild(db: Session) -> None:
+    """Recreate the index from the recipes table. The caller commits."""
+    connection = db.connection()
+    connection.execute(delete(documents))
+    _insert(connection)
+    connection.execute(text(f"INSERT INTO {TABLE_NAME}({TABLE_NAME}) VALUES ('optimize')"))
+
+@event.listens_for(Session, "after_flush")
+def _reindex_flushed(session, flush_context):
+    changed = {obj.id for obj in session.new if isinstance(obj, Recipe)}
+    changed.update(obj.id for obj in session.deleted if isinstance(obj, Recipe))
+    for obj in session.dirty:
+        if isinstance(obj, Recipe):
+            state = inspect(obj)
+            if any(state.attrs[c].history.has_changes() for c in COLUMNS):
+                changed.add(obj.id)
+    if changed:
+        reindex(session, changed)
+
+_TERM = re.compile(r'"([^"]*)"|(\w+)(\*?)', re.UNICODE)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Turn the search box text into an FTS5 query, or None if it has no words.
+    Everything is re-quoted, so FTS5 operators typed by users are inert.
+    """
+    terms = []
+    typing = False
+    for match in _TERM.finditer(query):
+        phrase, word, star = match.groups()
+        if phrase is not None:
+            words = _WORD.findall(phrase)
+            if words:
+                terms.append('"' + " ".join(words) + '"')
+            typing = False
+        else:
+            terms.append(f'"{word}"{star}')
+            # A bare word at the very end may still be being typed
+            typing = not star and match.end() == len(query)
+    if not terms:
+        return None
+    if typing:
+        terms[-1] += "*"
+    return " ".join(terms)
+
+def hits(expression: str):
+    """
+    Subquery of the recipes matching an FTS5 expression: recipe_id, rank
+    (BM25, lower is better) and snippet (with _OPEN/_CLOSE markers).
+    """
+    index = literal_column(TABLE_NAME)
+    return (
+        select(
+            literal_column("rowid").label("recipe_id"),
+            func.bm25(index, *WEIGHTS).label("rank"),
+            func.snippet(index, -1, _OPEN, _CLOSE, "…", SNIPPET_TOKENS).label("snippet"),
+        )
+        .select_from(table(TABLE_NAME))
+        .where(index.op("MATCH")(expression))
+        .subquery()
+    )
+
+def highlight(snippet: Optional[str]) -> Optional[str]:
+    """HTML for a snippet: the text escaped, matches wrapped in <mark>."""
+    if snippet is None:
+        return None
+    return str(escape(snippet)).replace(_OPEN, "<mark>").replace(_CLOSE, "</mark>")
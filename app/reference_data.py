@@ -0,0 +1,89 @@
+# File: app/reference_data.py
+# Cached option lists for filter dropdowns and forms. High-cardinality
+# filters (owners, service fruits, ASNs, countries, domains) use the
+# /typeahead endpoints instead.
+#
+# Each list is loaded with one narrow query, kept for REFERENCE_CACHE_TTL
+# seconds and dropped as soon as a commit in this process touches one of the
+# tables it is built from. The TTL bounds staleness for writes made by other
+# processes.
+import threading
+from typing import Callable, Dict, NamedTuple, Tuple
+
+from sqlalchemy import exists, select
+from sqlalchemy.orm import Session
+
+from app import data_versions
+from app.config import settings
+from app.models import Country, FruitType, Fruit
+from app.utils.cache import TTLCache
+
+class Option(NamedTuple):
+    id: int
+    name: str
+
+_cache = TTLCache(ttl=settings.REFERENCE_CACHE_TTL, maxsize=64)
+
+# Bumped on every invalidation; a load that raced with a write is not stored
+_generation = 0
+_lock = threading.Lock()
+
+# list name -> (loader, tables it is built from)
+_LISTS: Dict[str, Tuple[Callable[[Session], tuple], Tuple[str, ...]]] = {}
+
+def reference_list(name: str, *tables: str):
+    """Register `loader(db)` as the cached list `name`, invalidated by `tables`."""
+    def register(loader):
+        _LISTS[name] = (loader, tables)
+        return loader
+    return register
+
+def _invalidate(tables):
+    global _generation
+    with _lock:
+        _generation += 1
+        for name, (_, sources) in _LISTS.items():
+            if tables & set(sources):
+                _cache.pop(name)
+
+def get(db: Session, name: str) -> tuple:
+    """Get the cached list `name`, loading it on a miss."""
+    value = _cache.get(name)
+    if value is None:
+        loader, _ = _LISTS[name]
+        generation = _generation
+        value = loader(db)
+        with _lock:
+            if generation == _generation:
+                _cache.set(name, value)
+    return value
+
+def clear() -> None:
+    _cache.clear()
+
+def _options(db: Session, model) -> Tuple[Option, ...]:
+    return tuple(
+        Option(*row) for row in db.execute(select(model.id, model.name).order_by(model.name))
+    )
+
+def _used_names(db: Session, lookup, foreign_key) -> Tuple[str, ...]:
+    return tuple(
+        db.scalars(select(lookup.name).where(exists().where(foreign_key == lookup.id))
+                   .order_by(lookup.name))
+    )
+
+@reference_list("fruit_types", "fruit_types")
+def _fruit_types(db: Session) -> Tuple[Option, ...]:
+    return _options(db, FruitType)
+
+@reference_list("fruit_countries", "fruits", "countries")
+def _fruit_countries(db: Session) -> Tuple[str, ...]:
+    return _used_names(db, Country, Fruit.country_id)
+
+data_versions.on_change(*{table for _, tables in _LISTS.values() for table in tables})(_invalidate)
+
+def fruit_types(db: Session) -> Tuple[Option, ...]:
+    return get(db, "fruit_types")
+
+def fruit_countries(db: Session) -> Tuple[str, ...]:
+    return get(db, "fruit_countries")
@@ -1,7 +1,6 @@
 from fastapi import APIRouter, Depends, HTTPException, status, Response, Request, Form
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
-from fastapi.templating import Jinja2Templates
 from fastapi.responses import HTMLResponse, RedirectResponse
 from starlette.middleware.sessions import SessionMiddleware
 from starlette.middleware.authentication import AuthenticationMiddleware
@@ -18,10 +17,10 @@ import app.crud as crud
 import app.schemas as schemas
 from app.config import settings
 from app.dependencies import get_current_user, create_access_token
+from app.templating import templates
 from app.models import User
 
 router = APIRouter()  # Remove the prefix here since it's added in main.py
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/login", response_class=HTMLResponse)
 async def login_page(request: Request):
@@ -43,7 +42,7 @@ async def login(
     form_data: OAuth2PasswordRequestForm = Depends(),
     db: Session = Depends(get_db)
 ):
-    user = crud.authenticate_user(db, form_data.username, form_data.password)
+    user = await crud.authenticate_user(db, form_data.username, form_data.password)
     if not user:
         return RedirectResponse(
             url="/auth/login?error=Invalid+username+or+password",
@@ -124,7 +123,7 @@ async def register(
         )
     
     # Create user
-    user = crud.create_user(db, user)
+    user = await crud.create_user(db, user)
     
     # Create access token
     access_token = create_access_token(data={"sub": user.username})
@@ -169,7 +168,7 @@ async def update_user_me(
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    return crud.update_user(db, current_user.id, user_update)
+    return await crud.update_user(db, current_user.id, user_update)
 
 @router.post("/password")
 async def change_password(
@@ -177,11 +176,11 @@ async def change_password(
     current_user = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not crud.verify_password(db, current_user.id, password_change.old_password):
+    if not await crud.verify_password(db, current_user.id, password_change.old_password):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Incorrect password"
         )
     
-    crud.update_password(db, current_user.id, password_change.new_password)
+    await crud.update_password(db, current_user.id, password_change.new_password)
     return {"message": "Password updated successfully"}
\ No newline at end of file
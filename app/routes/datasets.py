@@ -11,7 +11,7 @@ from config import get_settings, DATASET_COLUMNS
 
 router = APIRouter()
     
-@router.get("/", response_model=schemas.FruitList)
+@router.get("/", response_model=schemas.ServiceSummaryList)
 async def get_dataset(
     skip: int = 0,
     limit: int = 100,
@@ -39,6 +39,7 @@ async def get_dataset(
             )
     
     # Get filter if filter_id provided
+    saved_filter = None
     if filter_id:
         saved_filter = crud.get_filter(db, filter_id)
         if not saved_filter:
@@ -54,7 +55,6 @@ async def get_dataset(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not authorized to use this filter"
             )
-        criteria = json.loads(saved_filter.filter_criteria)
     
     # Parse columns if provided
     visible_columns = None
@@ -73,9 +73,9 @@ async def get_dataset(
         skip=skip,
         limit=limit,
         filter_criteria=criteria,
+        saved_filter=saved_filter,
         sort_by=sort_by,
-        sort_desc=sort_desc,
-        columns=visible_columns
+        sort_desc=sort_desc
     )
 
 @router.post("/upload")
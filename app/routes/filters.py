@@ -34,8 +34,7 @@ async def create_filter(
 ):
     """Create a new filter."""
     if filter_create.group_id:
-        group = app.crud.get_group(db, filter_create.group_id)
-        if not group or not any(member.id == current_user.id for member in group.members):
+        if not app.crud.is_user_in_group(db, current_user.id, filter_create.group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not a member of the specified group"
@@ -68,6 +67,41 @@ async def get_filter(
     
     return filter
 
+@router.get("/{filter_id}/results", response_model=app.schemas.ServiceSummaryList)
+async def get_filter_results(
+    filter_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    sort_by: Optional[str] = None,
+    sort_desc: bool = False,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Get a page of the services matching a filter."""
+    filter = app.crud.get_filter(db, filter_id)
+    if not filter:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Filter not found"
+        )
+    
+    if (filter.user_id != current_user.id and 
+        (not filter.group_id or 
+         not app.crud.is_user_in_group(db, current_user.id, filter.group_id))):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to access this filter"
+        )
+    
+    return app.crud.get_fruit_dataset(
+        db,
+        skip=skip,
+        limit=limit,
+        saved_filter=filter,
+        sort_by=sort_by,
+        sort_desc=sort_desc
+    )
+
 @router.put("/{filter_id}", response_model=app.schemas.FilterResponse)
 async def update_filter(
     filter_id: int,
@@ -92,8 +126,7 @@ async def update_filter(
     
     # If updating group_id, verify membership
     if filter_update.group_id:
-        group = app.crud.get_group(db, filter_update.group_id)
-        if not group or not any(member.id == current_user.id for member in group.members):
+        if not app.crud.is_user_in_group(db, current_user.id, filter_update.group_id):
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Not a member of the specified group"
@@ -148,8 +181,7 @@ async def share_filter_with_group(
         )
     
     # Verify group membership
-    group = app.crud.get_group(db, group_id)
-    if not group or not any(member.id == current_user.id for member in group.members):
+    if not app.crud.is_user_in_group(db, current_user.id, group_id):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not a member of the specified group"
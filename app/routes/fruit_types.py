@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, Request, HTTPException, status, File, UploadFile
+from fastapi import APIRouter, Depends, Request, Response, HTTPException, status, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -6,13 +6,12 @@ from app.database import get_db
 import app.crud as crud
 import app.schemas as schemas
 from app.dependencies import get_current_user, get_current_admin_user
+from app.templating import templates, stream_template
+from app.conditional import Validators
 
 router = APIRouter(prefix="", tags=["fruit_types"])
 
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def list_fruit_types(
@@ -23,6 +22,12 @@ async def list_fruit_types(
     current_user = Depends(get_current_user)
 ):
     """List all fruit types with optional search and pagination."""
+    validators = Validators.for_tables(
+        request, db, "fruit_types", "fruits", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     # Set up pagination
     page_size = 10
     skip = (page - 1) * page_size
@@ -35,7 +40,7 @@ async def list_fruit_types(
         search=search
     )
     
-    return templates.TemplateResponse(
+    response = stream_template(
         "fruit_types.html",
         {
             "request": request,
@@ -45,8 +50,28 @@ async def list_fruit_types(
             "total_pages": (fruit_types.total + page_size - 1) // page_size
         }
     )
+    return validators.apply(response)
 
 
+@router.get("/api", response_model=schemas.FruitTypeList)
+async def list_fruit_types_api(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    search: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """API endpoint for listing fruit types."""
+    validators = Validators.for_tables(
+        request, db, "fruit_types", "fruits", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    content = crud.get_fruit_types_json(db, skip=skip, limit=limit, search=search)
+    return validators.apply(Response(content=content, media_type="application/json"))
+
 @router.post("/", response_model=schemas.FruitTypeResponse)
 async def create_fruit_type(
     fruit_type: schemas.FruitTypeCreate,
@@ -72,6 +97,12 @@ async def view_fruit_type(
     current_user = Depends(get_current_user)
 ):
     """View a specific fruit type's details."""
+    validators = Validators.for_tables(
+        request, db, "fruit_types", "fruits", "recipes", "fruit_type_recipe", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     fruit_type = crud.get_fruit_type(db, type_id)
     if not fruit_type:
         raise HTTPException(
@@ -79,13 +110,14 @@ async def view_fruit_type(
             detail="Fruit type not found"
         )
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "fruit_type_detail.html",
         {
             "request": request,
             "fruit_type": fruit_type
         }
     )
+    return validators.apply(response)
 
 @router.put("/{type_id}", response_model=schemas.FruitTypeResponse)
 async def update_fruit_type(
@@ -114,32 +146,28 @@ async def update_fruit_type(
     
     return crud.update_fruit_type(db, type_id, fruit_type_update)
 
-@router.delete("/{type_id}", response_model=schemas.SuccessResponse)
+@router.delete("/{type_id}", response_model=schemas.DeleteResult)
 async def delete_fruit_type(
     type_id: int,
     force: bool = False,
+    dry_run: bool = False,
     current_user: schemas.UserResponse = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
     Delete a fruit type (admin only).
-    Will fail if there are fruits or recipes associated unless force=True.
+    Will fail if there are fruits or recipes associated unless force=True,
+    which deletes the fruits and recipe links as well.
+    With dry_run=True, only report what would be deleted.
     """
-    fruit_type = crud.get_fruit_type(db, type_id)
-    if not fruit_type:
+    result = crud.delete_fruit_type(db, type_id, force=force, dry_run=dry_run)
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Fruit type not found"
         )
-    
-    if not force and (fruit_type.fruits or fruit_type.recipes):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete fruit type with associated fruits or recipes. Use force=True to override."
-        )
-    
-    crud.delete_fruit_type(db, type_id)
-    return {"message": "Fruit type deleted successfully"}
+    message = "Fruit type delete impact" if dry_run else "Fruit type deleted successfully"
+    return {"message": message, "dry_run": dry_run, **result}
 
 @router.post("/upload", response_model=schemas.FileUploadResponse)
 async def upload_fruit_types(
@@ -208,7 +236,7 @@ async def list_recipes_by_type(
     return crud.get_recipes_by_fruit_type(db, type_id, skip=skip, limit=limit)
 
 
-@router.post("/{type_id}/merge/{target_id}", response_model=schemas.FruitTypeResponse)
+@router.post("/{type_id}/merge/{target_id}", response_model=schemas.FruitTypeMergeResult)
 async def merge_fruit_types(
     type_id: int,
     target_id: int,
@@ -217,7 +245,8 @@ async def merge_fruit_types(
 ):
     """
     Merge one fruit type into another (admin only).
-    All fruits and recipes from source type will be moved to target type.
+    All fruits and recipes from source type will be moved to target type;
+    the response reports how many rows moved.
     """
     source_type = crud.get_fruit_type(db, type_id)
     target_type = crud.get_fruit_type(db, target_id)
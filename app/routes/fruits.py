@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, Request, status, File, UploadFile
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status, File, UploadFile
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
@@ -7,14 +7,14 @@ from app.database import get_db
 import app.crud as crud
 import app.schemas as schemas
 from app.dependencies import get_current_user, get_current_admin_user
+from app.templating import templates, stream_template
+from app.conditional import Validators
+from app import reference_data
 
 
 router = APIRouter(prefix="", tags=["fruits"])
 
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def list_fruits(
@@ -22,11 +22,18 @@ async def list_fruits(
     fruit_type_id: Optional[int] = None,
     country: Optional[str] = None,
     search: Optional[str] = None,
+    sort: Optional[str] = None,
     page: int = 1,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     """List all fruits with optional filtering."""
+    validators = Validators.for_tables(
+        request, db, "fruits", "fruit_types", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     # Get fruits with pagination
     page_size = 50
     skip = (page - 1) * page_size
@@ -38,16 +45,17 @@ async def list_fruits(
         limit=page_size,
         fruit_type_id=fruit_type_id,
         country=country,
-        search=search
+        search=search,
+        sort=sort
     )
     
     # Get fruit types for filter dropdown
-    fruit_types = crud.get_fruit_types(db).items
+    fruit_types = reference_data.fruit_types(db)
     
     # Get unique countries for filter dropdown
-    countries = crud.get_fruit_countries(db)
+    countries = reference_data.fruit_countries(db)
     
-    return templates.TemplateResponse(
+    response = stream_template(
         "fruits.html",
         {
             "request": request,
@@ -57,9 +65,41 @@ async def list_fruits(
             "selected_type": fruit_type_id,
             "selected_country": country,
             "search": search,
+            "sort": sort,
             "current_page": page
         }
     )
+    return validators.apply(response)
+
+@router.get("/api", response_model=schemas.FruitSummaryList)
+async def list_fruits_api(
+    request: Request,
+    skip: int = 0,
+    limit: int = 100,
+    fruit_type_id: Optional[int] = None,
+    country: Optional[str] = None,
+    search: Optional[str] = None,
+    sort: Optional[str] = None,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """API endpoint for listing fruits."""
+    validators = Validators.for_tables(
+        request, db, "fruits", "fruit_types", "services", "owners", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    content = crud.get_fruits_json(
+        db,
+        skip=skip,
+        limit=limit,
+        fruit_type_id=fruit_type_id,
+        country=country,
+        search=search,
+        sort=sort
+    )
+    return validators.apply(Response(content=content, media_type="application/json"))
 
 @router.post("/", response_model=schemas.FruitResponse)
 async def create_fruit(
@@ -88,6 +128,12 @@ async def get_fruit(
     current_user = Depends(get_current_user)
 ):
     """View a specific fruit's details."""
+    validators = Validators.for_tables(
+        request, db, "fruits", "fruit_types", "services", "owners", "recipes", "fruit_type_recipe", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     fruit = crud.get_fruit(db, fruit_id)
     if not fruit:
         raise HTTPException(
@@ -98,7 +144,7 @@ async def get_fruit(
     # Get compatible recipes for this fruit type
     compatible_recipes = crud.get_recipes_by_fruit_type(db, fruit.fruit_type_id)
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "fruit_detail.html",
         {
             "request": request,
@@ -106,6 +152,7 @@ async def get_fruit(
             "compatible_recipes": compatible_recipes
         }
     )
+    return validators.apply(response)
 
 @router.put("/{fruit_id}", response_model=schemas.FruitResponse)
 async def update_fruit(
@@ -134,24 +181,25 @@ async def update_fruit(
     
     return crud.update_fruit(db, fruit_id, fruit_update)
 
-@router.delete("/{fruit_id}", response_model=schemas.SuccessResponse)
+@router.delete("/{fruit_id}", response_model=schemas.DeleteResult)
 async def delete_fruit(
     fruit_id: int,
+    dry_run: bool = False,
     current_user: schemas.UserResponse = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     """
-    Delete a fruit (admin only).
+    Delete a fruit (admin only). Its services are kept, without a fruit.
+    With dry_run=True, only report what would be deleted.
     """
-    fruit = crud.get_fruit(db, fruit_id)
-    if not fruit:
+    result = crud.delete_fruit(db, fruit_id, dry_run=dry_run)
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Fruit not found"
         )
-    
-    crud.delete_fruit(db, fruit_id)
-    return {"message": "Fruit deleted successfully"}
+    message = "Fruit delete impact" if dry_run else "Fruit deleted successfully"
+    return {"message": message, "dry_run": dry_run, **result}
 
 @router.post("/upload", response_model=schemas.FileUploadResponse)
 async def upload_fruits(
@@ -206,7 +254,7 @@ async def get_countries(
     """
     Get list of all countries that have fruits.
     """
-    return crud.get_fruit_countries(db)
+    return list(reference_data.fruit_countries(db))
 
 
 @router.post("/{fruit_id}/change-type", response_model=schemas.FruitResponse)
@@ -128,6 +128,54 @@ async def delete_group(
     app.crud.delete_group(db, group_id)
     return {"message": "Group deleted successfully"}
 
+def _check_can_manage_members(db: Session, group_id: int, current_user):
+    group = app.crud.get_group(db, group_id)
+    if not group:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Group not found"
+        )
+    
+    # Groups record no creator, so bulk membership changes are admin only
+    if not current_user.is_admin:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Not authorized to modify group members"
+        )
+
+@router.post("/{group_id}/members", response_model=app.schemas.GroupMembersResult)
+async def add_group_members(
+    group_id: int,
+    members: app.schemas.GroupMembersUpdate,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Add many users to a group (admin only); users already in it are skipped."""
+    _check_can_manage_members(db, group_id, current_user)
+    return app.crud.update_group_members(db, group_id, members.user_ids, mode="add")
+
+@router.put("/{group_id}/members", response_model=app.schemas.GroupMembersResult)
+async def replace_group_members(
+    group_id: int,
+    members: app.schemas.GroupMembersUpdate,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Make the given users the group's exact membership (admin only)."""
+    _check_can_manage_members(db, group_id, current_user)
+    return app.crud.update_group_members(db, group_id, members.user_ids, mode="replace")
+
+@router.post("/{group_id}/members/remove", response_model=app.schemas.GroupMembersResult)
+async def remove_group_members(
+    group_id: int,
+    members: app.schemas.GroupMembersUpdate,
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """Remove many users from a group (admin only); users not in it are skipped."""
+    _check_can_manage_members(db, group_id, current_user)
+    return app.crud.update_group_members(db, group_id, members.user_ids, mode="remove")
+
 @router.post("/{group_id}/members/{user_id}")
 async def add_group_member(
     group_id: int,
@@ -1,7 +1,6 @@
 # File: app/routes/owners.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -9,14 +8,16 @@ from app.database import get_db
 import app.crud as crud
 import app.schemas as schemas
 from app.dependencies import get_current_user
+from app.templating import templates
+from app.conditional import Validators
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def list_owners(
     request: Request,
     search: Optional[str] = None,
+    sort: Optional[str] = None,
     page: int = 1,
     page_size: int = 10,
     db: Session = Depends(get_db),
@@ -29,7 +30,8 @@ async def list_owners(
         db,
         skip=skip,
         limit=page_size,
-        search=search
+        search=search,
+        sort=sort
     )
     
     return templates.TemplateResponse(
@@ -37,7 +39,8 @@ async def list_owners(
         {
             "request": request,
             "owners": owners,
-            "search": search
+            "search": search,
+            "sort": sort
         }
     )
 
@@ -58,6 +61,12 @@ async def view_owner(
     current_user = Depends(get_current_user)
 ):
     """View a specific owner's details."""
+    validators = Validators.for_tables(
+        request, db, "owners", "services", "fruits", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     owner = crud.get_owner(db, owner_id)
     if not owner:
         raise HTTPException(
@@ -68,7 +77,7 @@ async def view_owner(
     # Get services for this owner
     services = crud.get_services_by_owner(db, owner_id)
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "owner_detail.html",
         {
             "request": request,
@@ -76,6 +85,7 @@ async def view_owner(
             "services": services
         }
     )
+    return validators.apply(response)
 
 @router.put("/{owner_id}", response_model=schemas.OwnerResponse)
 async def update_owner(
@@ -93,30 +103,25 @@ async def update_owner(
         )
     return updated_owner
 
-@router.delete("/{owner_id}")
+@router.delete("/{owner_id}", response_model=schemas.DeleteResult)
 async def delete_owner(
     owner_id: int,
+    dry_run: bool = False,
     db: Session = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
-    """Delete an owner."""
-    # Check if owner has any services
-    owner = crud.get_owner(db, owner_id)
-    if not owner:
+    """
+    Delete an owner. Fails while the owner has services.
+    With dry_run=True, only report what would be deleted.
+    """
+    result = crud.delete_owner(db, owner_id, dry_run=dry_run)
+    if result is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Owner not found"
         )
-    
-    services = crud.get_services_by_owner(db, owner_id)
-    if services:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="Cannot delete owner with associated services"
-        )
-    
-    success = crud.delete_owner(db, owner_id)
-    return {"message": "Owner deleted successfully"}
+    message = "Owner delete impact" if dry_run else "Owner deleted successfully"
+    return {"message": message, "dry_run": dry_run, **result}
 
 @router.get("/{owner_id}/services")
 async def list_owner_services(
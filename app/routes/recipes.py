@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Request
+from fastapi import APIRouter, Depends, HTTPException, status, File, UploadFile, Request, Response, Query
 from sqlalchemy.orm import Session
 from typing import List, Optional
 
@@ -6,13 +6,13 @@ from app.database import get_db
 import app.crud as crud
 import app.schemas as schemas
 from app.dependencies import get_current_user, get_current_admin_user
+from app.templating import templates, stream_template
+from app.conditional import Validators
+from app import reference_data
 
 router = APIRouter()  # Remove the prefix, it's handled in main.py
 
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
-
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def list_recipes(
@@ -25,6 +25,12 @@ async def list_recipes(
     current_user = Depends(get_current_user)
 ):
     """List all recipes with optional filtering."""
+    validators = Validators.for_tables(
+        request, db, "recipes", "fruit_type_recipe", "fruit_types", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     page_size = 10
     skip = (page - 1) * page_size
 
@@ -43,9 +49,9 @@ async def list_recipes(
     )
     
     # Get fruit types for filter dropdown
-    fruit_types = crud.get_fruit_types(db).items
+    fruit_types = reference_data.fruit_types(db)
     
-    return templates.TemplateResponse(
+    response = stream_template(
         "recipes.html",
         {
             "request": request,
@@ -57,9 +63,11 @@ async def list_recipes(
             "current_user": current_user
         }
     )
+    return validators.apply(response)
 
-@router.get("/api", response_model=schemas.RecipeList)
+@router.get("/api", response_model=schemas.RecipeSummaryList)
 async def list_recipes_api(
+    request: Request,
     skip: int = 0,
     limit: int = 100,
     search: Optional[str] = None,
@@ -69,7 +77,13 @@ async def list_recipes_api(
     db: Session = Depends(get_db)
 ):
     """API endpoint for listing recipes."""
-    return crud.get_recipes(
+    validators = Validators.for_tables(
+        request, db, "recipes", "fruit_type_recipe", "fruit_types", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
+    content = crud.get_recipes_json(
         db,
         skip=skip,
         limit=limit,
@@ -77,6 +91,23 @@ async def list_recipes_api(
         fruit_type_id=fruit_type_id,
         max_time=max_time
     )
+    return validators.apply(Response(content=content, media_type="application/json"))
+
+@router.get("/match", response_model=schemas.RecipeMatchList)
+async def match_recipes(
+    fruit_type_ids: List[int] = Query([]),
+    mode: str = "all",
+    skip: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1, le=500),
+    current_user = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Recipes for a fruit inventory: mode=all (uses every type), any (uses at
+    least one) or subset (needs nothing else), ranked by how many of the
+    inventory types each recipe uses.
+    """
+    return crud.match_recipes(db, fruit_type_ids, mode=mode, skip=skip, limit=limit)
 
 @router.get("/{recipe_id}", response_class=HTMLResponse)
 async def view_recipe(
@@ -86,6 +117,12 @@ async def view_recipe(
     current_user = Depends(get_current_user)
 ):
     """View a specific recipe's details."""
+    validators = Validators.for_tables(
+        request, db, "recipes", "fruit_type_recipe", "fruit_types", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     recipe = crud.get_recipe(db, recipe_id)
     if not recipe:
         raise HTTPException(
@@ -94,9 +131,9 @@ async def view_recipe(
         )
     
     # Get available fruit types for admin management
-    available_fruit_types = crud.get_fruit_types(db).items if current_user.is_admin else []
+    available_fruit_types = reference_data.fruit_types(db) if current_user.is_admin else []
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "recipe_detail.html",
         {
             "request": request,
@@ -105,6 +142,7 @@ async def view_recipe(
             "available_fruit_types": available_fruit_types
         }
     )
+    return validators.apply(response)
 
 @router.post("/", response_model=schemas.RecipeResponse)
 async def create_recipe(
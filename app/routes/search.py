@@ -0,0 +1,34 @@
+# File: app/routes/search.py
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from sqlalchemy.orm import Session
+from typing import Optional
+
+from app.database import get_db
+import app.schemas as schemas
+from app.dependencies import get_current_user
+from app import search
+
+router = APIRouter()
+
+@router.get("/", response_model=schemas.SearchResponse)
+async def search_all(
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = None,
+    limit: int = Query(5, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """
+    Search fruits, fruit types, recipes, owners and services at once.
+    `types` is a comma-separated subset; `limit` applies per type.
+    """
+    selected = None
+    if types:
+        selected = [t.strip() for t in types.split(",") if t.strip()]
+        unknown = [t for t in selected if t not in search.DOCUMENT_TYPES]
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown types: {', '.join(unknown)}"
+            )
+    return {"query": q, "results": search.search(db, q, selected, limit)}
@@ -1,7 +1,6 @@
 # File: app/routes/services.py
 from fastapi import APIRouter, Depends, HTTPException, status, Request, File, UploadFile
 from fastapi.responses import HTMLResponse
-from fastapi.templating import Jinja2Templates
 from sqlalchemy.orm import Session
 from typing import List, Optional
 import csv
@@ -11,9 +10,10 @@ from app.database import get_db
 import app.crud as crud
 import app.schemas as schemas
 from app.dependencies import get_current_user
+from app.templating import templates, stream_template
+from app.conditional import Validators
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 @router.get("/", response_class=HTMLResponse)
 async def list_services(
@@ -32,6 +32,12 @@ async def list_services(
     current_user = Depends(get_current_user)
 ):
     """List all services with optional filtering."""
+    validators = Validators.for_tables(
+        request, db, "services", "owners", "fruits", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     skip = (page - 1) * page_size
     
     services = crud.get_services(
@@ -48,28 +54,27 @@ async def list_services(
         search=search
     )
     
-    # Get filter options
-    owners = crud.get_owners(db)
-    fruits = crud.get_fruits(db)
-    countries = crud.get_unique_countries(db)
-    asns = crud.get_unique_asns(db)
+    # Filter options come from the /typeahead endpoints; only the names of
+    # the selected owner and fruit are needed to fill the inputs
+    owner = crud.get_owner(db, owner_id) if owner_id else None
+    fruit = crud.get_fruit(db, fruit_id) if fruit_id else None
     
-    return templates.TemplateResponse(
+    response = stream_template(
         "services.html",
         {
             "request": request,
             "services": services,
-            "owners": owners,
-            "fruits": fruits,
-            "countries": countries,
-            "asns": asns,
             "selected_owner": owner_id,
+            "selected_owner_name": owner.name if owner else None,
             "selected_fruit": fruit_id,
+            "selected_fruit_name": fruit.name if fruit else None,
             "selected_country": country,
             "selected_asn": asn,
+            "selected_domain": domain,
             "search": search
         }
     )
+    return validators.apply(response)
 
 @router.post("/", response_model=schemas.ServiceResponse)
 async def create_service(
@@ -88,6 +93,12 @@ async def view_service(
     current_user = Depends(get_current_user)
 ):
     """View a specific service's details."""
+    validators = Validators.for_tables(
+        request, db, "services", "owners", "fruits", user=current_user
+    )
+    if validators.matches(request):
+        return validators.not_modified()
+    
     service = crud.get_service(db, service_id)
     if not service:
         raise HTTPException(
@@ -95,13 +106,14 @@ async def view_service(
             detail="Service not found"
         )
     
-    return templates.TemplateResponse(
+    response = templates.TemplateResponse(
         "service_detail.html",
         {
             "request": request,
             "service": service
         }
     )
+    return validators.apply(response)
 
 @router.put("/{service_id}", response_model=schemas.ServiceResponse)
 async def update_service(
@@ -0,0 +1,53 @@
+# File: app/routes/typeahead.py
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.orm import Session
+from typing import List, Optional
+
+from app.database import get_db
+import app.crud as crud
+import app.schemas as schemas
+from app.dependencies import get_current_user
+
+router = APIRouter()
+
+# Suggestions may be a little stale; let the browser reuse them while typing
+CACHE_CONTROL = "private, max-age=30"
+
+@router.get("/owners", response_model=List[schemas.Suggestion])
+async def suggest_owners(
+    response: Response,
+    q: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Owners whose name starts with `q`."""
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return crud.suggest_owners(db, q, limit)
+
+@router.get("/fruits", response_model=List[schemas.Suggestion])
+async def suggest_fruits(
+    response: Response,
+    q: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Fruits whose name starts with `q`."""
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return crud.suggest_fruits(db, q, limit)
+
+@router.get("/{field}", response_model=List[str])
+async def suggest_service_values(
+    field: str,
+    response: Response,
+    q: Optional[str] = None,
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db),
+    current_user = Depends(get_current_user)
+):
+    """Distinct service ASNs, countries or domains starting with `q`."""
+    if field not in crud.SERVICE_SUGGEST_FIELDS:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Unknown field")
+    response.headers["Cache-Control"] = CACHE_CONTROL
+    return crud.suggest_service_values(db, field, q, limit)
@@ -8,6 +8,12 @@ class SuccessResponse(BaseModel):
     message: str
     status: str = "success"
 
+class DeleteResult(SuccessResponse):
+    dry_run: bool = False
+    deleted: Dict[str, int] = {}  # rows per table
+    nullified: Dict[str, int] = {}  # detached rows per relationship
+    blocked: Dict[str, int] = {}  # rows per relationship refusing the delete
+
 class ErrorResponse(BaseModel):
     detail: str
     status: str = "error"
@@ -61,6 +67,7 @@ class FruitTypeUpdate(FruitTypeBase):
 class FruitTypeResponse(FruitTypeBase):
     id: int
     fruit_count: Optional[int] = 0
+    recipe_count: Optional[int] = 0
 
     class Config:
         from_attributes = True
@@ -68,6 +75,12 @@ class FruitTypeResponse(FruitTypeBase):
 # Alias for backwards compatibility
 FruitType = FruitTypeResponse
 
+class FruitTypeMergeResult(BaseModel):
+    target: FruitTypeResponse
+    fruits_moved: int
+    recipes_moved: int
+    duplicate_recipe_links_removed: int
+
 # Owner Models
 class OwnerBase(BaseModel):
     name: str
@@ -85,6 +98,7 @@ class OwnerUpdate(BaseModel):
 class OwnerResponse(OwnerBase):
     id: int
     created_at: datetime
+    service_count: Optional[int] = 0
 
     class Config:
         from_attributes = True
@@ -176,6 +190,7 @@ class FruitUpdate(BaseModel):
 class FruitResponse(FruitBase):
     id: int
     fruit_type: FruitTypeResponse
+    service_count: Optional[int] = 0
     services: List[ServiceResponseBase] = []
 
     class Config:
@@ -234,6 +249,91 @@ class ServiceList(PaginatedResponse):
 class OwnerList(PaginatedResponse):
     items: List[OwnerResponse]
 
+# List-view projections: heavy text columns are left out and replaced by
+# short previews computed in SQL. Detail pages use the full responses.
+class NamedRef(BaseModel):
+    id: int
+    name: str
+
+    class Config:
+        from_attributes = True
+
+class ServiceSummary(BaseModel):
+    id: int
+    ip: str
+    port: int
+    asn: Optional[str] = None
+    country: Optional[str] = None
+    domain: Optional[str] = None
+    fruit_id: Optional[int] = None
+    owner_id: Optional[int] = None
+    timestamp: datetime
+    banner_preview: Optional[str] = None
+    fruit: Optional[NamedRef] = None
+    owner: Optional[NamedRef] = None
+
+    class Config:
+        from_attributes = True
+
+class ServiceSummaryList(PaginatedResponse):
+    items: List[ServiceSummary]
+
+class FruitSummary(BaseModel):
+    id: int
+    name: str
+    country_of_origin: Optional[str] = None
+    date_picked: datetime
+    fruit_type_id: int
+    fruit_type: NamedRef
+    service_count: int = 0
+    services: List[ServiceSummary] = []
+
+    class Config:
+        from_attributes = True
+
+class FruitSummaryList(PaginatedResponse):
+    items: List[FruitSummary]
+
+class RecipeSummary(BaseModel):
+    id: int
+    name: str
+    description_preview: Optional[str] = None
+    snippet: Optional[str] = None  # search match in context, as escaped HTML
+    preparation_time: Optional[int] = None
+    created_at: datetime
+    fruit_types: List[NamedRef]
+
+    class Config:
+        from_attributes = True
+
+class RecipeSummaryList(PaginatedResponse):
+    items: List[RecipeSummary]
+
+class RecipeMatch(BaseModel):
+    recipe: RecipeSummary
+    matched: int  # inventory fruit types the recipe uses
+    required: int  # fruit types the recipe uses
+
+class RecipeMatchList(PaginatedResponse):
+    items: List[RecipeMatch]
+
+# Typeahead Models
+class Suggestion(BaseModel):
+    id: int
+    name: str
+
+# Search Models
+class SearchResult(BaseModel):
+    type: str
+    id: int
+    title: str
+    url: str
+    score: float
+
+class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+
 # Group Models
 class GroupBase(BaseModel):
     name: str
@@ -259,6 +359,15 @@ Group = GroupResponse
 class GroupList(PaginatedResponse):
     items: List[GroupResponse]
 
+class GroupMembersUpdate(BaseModel):
+    user_ids: List[int]
+
+class GroupMembersResult(BaseModel):
+    group_id: int
+    added: int
+    removed: int
+    member_count: int
+
 # Filter Models
 class FilterBase(BaseModel):
     name: str
@@ -266,6 +375,7 @@ class FilterBase(BaseModel):
     filter_criteria: Dict[str, Any]
     visible_columns: List[str]
     group_id: Optional[int] = None
+    materialized: bool = False
 
 class FilterCreate(FilterBase):
     pass
@@ -281,6 +391,11 @@ class FilterResponse(FilterBase):
     user: UserResponse
     group: Optional[GroupResponse] = None
 
+    @validator('filter_criteria', 'visible_columns', pre=True)
+    def decode_json(cls, v):
+        # Stored as JSON text on the model
+        return json.loads(v) if isinstance(v, str) else v
+
     class Config:
         from_attributes = True
 
@@ -0,0 +1,200 @@
+# File: app/search.py
+# Unified search over fruits, fruit types, recipes, owners and services.
+#
+# Every searchable row has one document in the `search_documents` FTS5
+# table (title + body text), kept in step with the source tables by a flush
+# hook and rebuilt from scratch with `python -m app.migrate rebuild-search`.
+# A document's rowid encodes its type and id, so it is replaced or deleted
+# with a rowid lookup. Core and bulk statements bypass the unit of work and
+# must call `reindex` themselves.
+import re
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence, Set
+
+from sqlalchemy import String, cast, column, delete, event, func, inspect, insert, literal, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models import Fruit, FruitType, Owner, Recipe, Service
+
+TABLE_NAME = "search_documents"
+
+CREATE_TABLE = f"""
+CREATE VIRTUAL TABLE {TABLE_NAME} USING fts5(
+    entity_type UNINDEXED,
+    entity_id UNINDEXED,
+    title,
+    body,
+    tokenize = 'unicode61 remove_diacritics 2'
+)
+"""
+
+documents = table(
+    TABLE_NAME,
+    column("rowid"), column("entity_type"), column("entity_id"), column("title"), column("body")
+)
+
+# Type codes occupy the low bits of the rowid: rowid = id * 8 + code
+_ROWID_STRIDE = 8
+
+def _text(*columns):
+    """Space-separated concatenation of the non-null columns."""
+    parts = [func.coalesce(cast(c, String), "") for c in columns]
+    expression = parts[0]
+    for part in parts[1:]:
+        expression = expression + " " + part
+    return expression
+
+# entity type -> (type code, model, title expression, body expression, URL prefix)
+DOCUMENT_TYPES = {
+    "fruit_type": (1, FruitType, lambda: FruitType.name, lambda: _text(FruitType.description),
+                   "/fruit-types"),
+    "fruit": (2, Fruit, lambda: Fruit.name, lambda: _text(Fruit.country_of_origin), "/fruits"),
+    "recipe": (3, Recipe, lambda: Recipe.name,
+               lambda: _text(Recipe.description, Recipe.instructions), "/recipes"),
+    "owner": (4, Owner, lambda: Owner.name,
+              lambda: _text(Owner.description, Owner.contact_info), "/owners"),
+    "service": (5, Service, lambda: _text(Service.ip) + ":" + cast(Service.port, String),
+                lambda: _text(Service.domain, Service.asn, Service.country, Service.banner_data),
+                "/services"),
+}
+
+# Model attributes that feed each document; other changes skip reindexing
+_INDEXED_ATTRIBUTES = {
+    FruitType: ("name", "description"),
+    Fruit: ("name", "country_of_origin"),
+    Recipe: ("name", "description", "instructions"),
+    Owner: ("name", "description", "contact_info"),
+    Service: ("ip", "port", "domain", "asn", "country", "banner_data"),
+}
+
+_TYPE_BY_MODEL = {model: name for name, (_, model, *_rest) in DOCUMENT_TYPES.items()}
+
+CHUNK_SIZE = 500
+
+def _rowid(entity_type: str, entity_id: int) -> int:
+    return entity_id * _ROWID_STRIDE + DOCUMENT_TYPES[entity_type][0]
+
+def _select_documents(entity_type: str, ids: Optional[Sequence[int]] = None):
+    code, model, title, body, _ = DOCUMENT_TYPES[entity_type]
+    query = select(
+        model.id * _ROWID_STRIDE + code, literal(entity_type), model.id, title(), body()
+    )
+    if ids is not None:
+        query = query.where(model.id.in_(ids))
+    return query
+
+def _insert(connection, entity_type: str, ids: Optional[Sequence[int]] = None) -> None:
+    connection.execute(
+        insert(documents).from_select(
+            ["rowid", "entity_type", "entity_id", "title", "body"],
+            _select_documents(entity_type, ids)
+        )
+    )
+
+def _chunks(ids: Iterable[int]):
+    ids = sorted(ids)
+    for start in range(0, len(ids), CHUNK_SIZE):
+        yield ids[start:start + CHUNK_SIZE]
+
+def reindex(db: Session, entity_type: str, ids: Iterable[int]) -> None:
+    """Replace the documents of the given rows; rows that no longer exist are dropped."""
+    connection = db.connection()
+    for chunk in _chunks(set(ids)):
+        connection.execute(
+            delete(documents).where(
+                documents.c.rowid.in_([_rowid(entity_type, entity_id) for entity_id in chunk])
+            )
+        )
+        _insert(connection, entity_type, chunk)
+
+def rebuild(db: Session) -> None:
+    """Recreate every document from the source tables. The caller commits."""
+    connection = db.connection()
+    connection.execute(delete(documents))
+    for entity_type in DOCUMENT_TYPES:
+        _insert(connection, entity_type)
+    # Merge the freshly written index segments
+    connection.execute(text(f"INSERT INTO {TABLE_NAME}({TABLE_NAME}) VALUES ('optimize')"))
+
+def _needs_reindex(obj) -> bool:
+    state = inspect(obj)
+    return any(
+        state.attrs[key].history.has_changes() for key in _INDEXED_ATTRIBUTES[type(obj)]
+    )
+
+@event.listens_for(Session, "after_flush")
+def _reindex_flushed(session, flush_context):
+    changed: Dict[str, Set[int]] = defaultdict(set)
+    for obj in session.new:
+        if type(obj) in _TYPE_BY_MODEL:
+            changed[_TYPE_BY_MODEL[type(obj)]].add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in _TYPE_BY_MODEL and _needs_reindex(obj):
+            changed[_TYPE_BY_MODEL[type(obj)]].add(obj.id)
+    for obj in session.deleted:
+        if type(obj) in _TYPE_BY_MODEL:
+            changed[_TYPE_BY_MODEL[type(obj)]].add(obj.id)
+    for entity_type, ids in changed.items():
+        reindex(session, entity_type, ids)
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+def match_expression(query: str) -> Optional[str]:
+    """
+    Turn free text into an FTS5 query: every word must match, and the last
+    one may be a prefix of a longer word. None if there are no words.
+    """
+    words = _TOKEN.findall(query)
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+def search(
+    db: Session,
+    query: str,
+    types: Optional[Sequence[str]] = None,
+    limit_per_type: int = 5
+) -> List[dict]:
+    """
+    Best matches across entity types, ranked by BM25 with titles weighted
+    above body text, at most `limit_per_type` of each type.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return []
+    types = list(types or DOCUMENT_TYPES)
+    type_filter = ", ".join(f":type_{i}" for i in range(len(types)))
+    rows = db.execute(
+        text(f"""
+            SELECT entity_type, entity_id, title, score FROM (
+                SELECT entity_type, entity_id, title, score,
+                       row_number() OVER (PARTITION BY entity_type ORDER BY score) AS position
+                FROM (
+                    SELECT entity_type, entity_id, title,
+                           bm25({TABLE_NAME}, 0, 0, 10.0, 1.0) AS score
+                    FROM {TABLE_NAME}
+                    WHERE {TABLE_NAME} MATCH :match AND entity_type IN ({type_filter})
+                )
+            )
+            WHERE position <= :limit
+            ORDER BY score
+        """),
+        {
+            "match": expression,
+            "limit": limit_per_type,
+            **{f"type_{i}": entity_type for i, entity_type in enumerate(types)}
+        }
+    )
+    return [
+        {
+            "type": row.entity_type,
+            "id": row.entity_id,
+            "title": row.title,
+            "url": f"{DOCUMENT_TYPES[row.entity_type][4]}/{row.entity_id}",
+            # bm25() is lower-is-better; expose higher-is-better
+            "score": -row.score
+        }
+        for row in rows
+    ]
@@ -0,0 +1,87 @@
+# File: app/serialization.py
+import json
+import typing
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, Sequence, Type
+
+from pydantic import BaseModel
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+def _python_types(annotation) -> tuple:
+    """Python types a field annotation accepts, with Optional unwrapped."""
+    origin = typing.get_origin(annotation)
+    if origin is typing.Union:
+        return tuple(t for arg in typing.get_args(annotation) for t in _python_types(arg))
+    if origin is not None:
+        return (origin,)
+    if annotation is type(None):
+        return (type(None),)
+    return (annotation,)
+
+class RowEncoder:
+    """
+    Encodes SQL row tuples as dicts shaped like a flat pydantic schema.
+    The column list is checked against the schema once, when the encoder is
+    built, so rows are not validated one at a time.
+    """
+
+    def __init__(self, schema: Type[BaseModel], columns: Sequence, nested: Sequence[str] = ()):
+        fields = schema.model_fields
+        self.columns = list(columns)
+        self.keys = tuple(column.key for column in self.columns)
+
+        unknown = [key for key in self.keys if key not in fields]
+        if unknown:
+            raise ValueError(f"{schema.__name__} has no fields {unknown}")
+
+        for column in self.columns:
+            accepted = _python_types(fields[column.key].annotation)
+            python_type = column.type.python_type
+            if not any(isinstance(t, type) and issubclass(python_type, t) for t in accepted):
+                raise TypeError(
+                    f"{schema.__name__}.{column.key} does not accept {python_type.__name__}"
+                )
+
+        missing = [
+            name for name, field in fields.items()
+            if name not in self.keys and name not in nested and field.is_required()
+        ]
+        if missing:
+            raise ValueError(f"{schema.__name__} fields {missing} have no source column")
+
+        # Defaults for schema fields that are not selected, e.g. fruit_count
+        self.defaults = {
+            name: field.get_default(call_default_factory=True)
+            for name, field in fields.items()
+            if name not in self.keys and name not in nested
+        }
+
+    def encode_row(self, row: Sequence) -> Dict[str, Any]:
+        item = dict(zip(self.keys, row))
+        if self.defaults:
+            item.update(self.defaults)
+        return item
+
+    def encode_rows(self, rows: Iterable[Sequence]) -> List[Dict[str, Any]]:
+        keys, defaults = self.keys, self.defaults
+        if defaults:
+            return [{**dict(zip(keys, row)), **defaults} for row in rows]
+        return [dict(zip(keys, row)) for row in rows]
+
+def dump_page(items: List[Dict[str, Any]], total: int, skip: int, limit: int) -> bytes:
+    """Serialize a page in the PaginatedResponse shape."""
+    return json.dumps(
+        {
+            "items": items,
+            "total": total,
+            "page": skip // limit + 1,
+            "size": limit,
+            "pages": (total + limit - 1) // limit
+        },
+        default=_json_default,
+        separators=(",", ":")
+    ).encode()
@@ -0,0 +1,56 @@
+# File: app/templating.py
+from typing import Iterator
+
+from fastapi.responses import StreamingResponse
+from fastapi.templating import Jinja2Templates
+from jinja2 import FileSystemBytecodeCache
+
+from app.config import settings
+
+# Single environment (and template cache) shared by main.py and every router
+templates = Jinja2Templates(directory="app/templates")
+
+if settings.TEMPLATE_BYTECODE_CACHE:
+    # Without a directory Jinja uses a private per-user temp dir
+    templates.env.bytecode_cache = FileSystemBytecodeCache(settings.TEMPLATE_CACHE_DIR)
+
+# Skip the per-render mtime check outside development
+templates.env.auto_reload = settings.environment != "production"
+
+STREAM_CHUNK_SIZE = 8192
+
+def precompile_templates() -> int:
+    """Compile every template up front so no request pays for it."""
+    names = templates.env.list_templates(extensions=["html"])
+    for name in names:
+        templates.env.get_template(name)
+    return len(names)
+
+def _buffered(chunks: Iterator[str], size: int = STREAM_CHUNK_SIZE) -> Iterator[str]:
+    """Join Jinja's many small output fragments into larger chunks."""
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield "".join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield "".join(buffer)
+
+def stream_template(name: str, context: dict, status_code: int = 200) -> StreamingResponse:
+    """
+    Render a template incrementally with `generate()`.
+    The page head goes out before the rest of the table is rendered, so
+    time-to-first-byte does not grow with the number of rows.
+    """
+    if "request" not in context:
+        raise ValueError('context must include a "request" key')
+    template = templates.get_template(name)
+    return StreamingResponse(
+        _buffered(template.generate(context)),
+        status_code=status_code,
+        media_type="text/html"
+    )
@@ -0,0 +1,105 @@
+# File: app/trigram.py
+# Trigram indexes for substring (`ilike '%term%'`) filters.
+#
+# Each indexed model has an FTS5 table using the trigram tokenizer whose
+# rowid is the model's id and whose columns copy the searched columns. A
+# quoted phrase MATCH against it finds the rows containing a substring in
+# one index lookup. The trigram tokenizer folds case more broadly than
+# SQLite's ASCII-only lower(), so its hits are candidates: `contains` keeps
+# the original ilike test on top, and results are exactly what ilike alone
+# returns. Tables are kept current by a flush hook; Core and bulk
+# statements must call `reindex` themselves.
+from collections import defaultdict
+from typing import Dict, Iterable, Set
+
+from sqlalchemy import and_, column, delete, event, insert, inspect, literal_column, or_, select, table, text
+from sqlalchemy.orm import Session
+
+from app.models import Fruit, Owner, Service
+
+# Index table -> (model, indexed columns)
+TRIGRAM_TABLES = {
+    "fruit_trigrams": (Fruit, ("name", "country_of_origin")),
+    "owner_trigrams": (Owner, ("name", "description")),
+    "service_trigrams": (Service, ("ip", "asn", "country", "domain", "banner_data")),
+}
+
+_TABLE_BY_MODEL = {model: name for name, (model, _) in TRIGRAM_TABLES.items()}
+
+# Shorter terms have no trigram to look up
+MIN_TERM_LENGTH = 3
+
+CHUNK_SIZE = 500
+
+def create_table_ddl(name: str) -> str:
+    _, columns = TRIGRAM_TABLES[name]
+    return (f"CREATE VIRTUAL TABLE {name} USING fts5("
+            f"{', '.join(columns)}, tokenize = 'trigram')")
+
+def _table(name: str):
+    _, columns = TRIGRAM_TABLES[name]
+    return table(name, column("rowid"), *(column(c) for c in columns))
+
+def _insert(connection, name: str, ids=None) -> None:
+    model, columns = TRIGRAM_TABLES[name]
+    query = select(model.id, *(getattr(model, c) for c in columns))
+    if ids is not None:
+        query = query.where(model.id.in_(ids))
+    connection.execute(insert(_table(name)).from_select(["rowid", *columns], query))
+
+def reindex(db: Session, model, ids: Iterable[int]) -> None:
+    """Refresh the trigram rows of the given ids; missing rows are dropped."""
+    name = _TABLE_BY_MODEL[model]
+    index = _table(name)
+    connection = db.connection()
+    ids = sorted(set(ids))
+    for start in range(0, len(ids), CHUNK_SIZE):
+        chunk = ids[start:start + CHUNK_SIZE]
+        connection.execute(delete(index).where(index.c.rowid.in_(chunk)))
+        _insert(connection, name, chunk)
+
+def rebuild(db: Session, name: str) -> None:
+    """Recreate one trigram table from its model. The caller commits."""
+    connection = db.connection()
+    connection.execute(delete(_table(name)))
+    _insert(connection, name)
+    connection.execute(text(f"INSERT INTO {name}({name}) VALUES ('optimize')"))
+
+def contains(model, term: str, *columns):
+    """
+    Criterion equivalent to `or_(c.ilike('%term%') for c in columns)`,
+    answered from the model's trigram index when the term allows it.
+    """
+    exact = or_(*(c.ilike(f"%{term}%") for c in columns))
+    # LIKE wildcards in the term have no substring equivalent
+    if len(term) < MIN_TERM_LENGTH or "%" in term or "_" in term:
+        return exact
+    name = _TABLE_BY_MODEL[model]
+    phrase = '"' + term.replace('"', '""') + '"'
+    match = f"{{{' '.join(c.key for c in columns)}}} : {phrase}"
+    candidates = (
+        select(column("rowid"))
+        .select_from(table(name))
+        .where(literal_column(name).op("MATCH")(match))
+    )
+    return and_(model.id.in_(candidates), exact)
+
+def _needs_reindex(obj) -> bool:
+    state = inspect(obj)
+    _, columns = TRIGRAM_TABLES[_TABLE_BY_MODEL[type(obj)]]
+    return any(state.attrs[c].history.has_changes() for c in columns)
+
+@event.listens_for(Session, "after_flush")
+def _reindex_flushed(session, flush_context):
+    changed: Dict[type, Set[int]] = defaultdict(set)
+    for obj in session.new:
+        if type(obj) in _TABLE_BY_MODEL:
+            changed[type(obj)].add(obj.id)
+    for obj in session.dirty:
+        if type(obj) in _TABLE_BY_MODEL and _needs_reindex(obj):
+            changed[type(obj)].add(obj.id)
+    for obj in session.deleted:
+        if type(obj) in _TABLE_BY_MODEL:
+            changed[type(obj)].add(obj.id)
+    for model, ids in changed.items():
+        reindex(session, model, ids)